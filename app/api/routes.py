@@ -1,16 +1,19 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, UploadFile, File, Form, Request, Response
+from fastapi.responses import JSONResponse
 from app.models.schemas import QueryRequest, QueryResponse
 from app.containers import container, Container
 from app.services.chat_service import ChatService
+from app.core.executor import ExecutorSaturatedError
+from app.core.cancellation import ClientDisconnectedError, run_until_disconnected
 from app.core.logging import logger
 import shutil
 import os
 
 router = APIRouter()
 
-def get_chat_service():
-    """Dependency provider for ChatService"""
-    return ChatService(container.llm_router, container.retriever)
+async def get_chat_service():
+    """Dependency provider for the shared ChatService"""
+    return await container.aget("chat_service")
 
 import httpx
 from app.core.config import settings
@@ -21,33 +24,47 @@ async def health_check():
     
     ollama_status = "offline"
     try:
-        # Base URL usually http://localhost:11434/v1, we want root
-        base_url = settings.LOCAL_LLM_URL.replace("/v1", "").rstrip("/")
-        async with httpx.AsyncClient(timeout=httpx.Timeout(timeout=2.0)) as client:
-            res = await client.get(f"{base_url}/api/tags")
-            if res.status_code == 200:
-                ollama_status = "online"
+        res = await container.ollama_client.get("/api/tags", timeout=2.0)
+        if res.status_code == 200:
+            ollama_status = "online"
     except Exception:
         pass
         
-    return {"status": "ok", "ollama": ollama_status}
+    return {"status": "ok", "ollama": ollama_status, "http_pools": container.http_clients.stats()}
+
+@router.get("/ready", status_code=200)
+async def readiness_check():
+    """Whether models and indexes are loaded; /health only says the process is up."""
+    body = {"ready": container.is_ready(), "init_ms": container.init_timings}
+    if container.warmup_error:
+        body["error"] = container.warmup_error
+    if not body["ready"]:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+@router.get("/metrics", status_code=200)
+async def get_metrics():
+    """Runtime counters for sizing executors and caches."""
+    return {
+        "requests": container.request_counters.snapshot(),
+        "retrieval_executor": container.retrieval_executor.stats(),
+        "ingestion_executor": container.ingestion_executor.stats(),
+        "model_batching": container.models.stats(),
+        "embedding_cache": container.embedding_cache.stats() if container.embedding_cache else None,
+        "rerank_cache": container.rerank_cache.stats() if container.rerank_cache else None,
+        "query_cache": container.query_cache.stats() if container.query_cache else None,
+        "expansion_cache": container.expansion_cache.stats() if container.expansion_cache else None,
+    }
 
 def ingest_data_task():
-    """Background task to load and index data."""
+    """Background task to incrementally load and index new or changed data."""
     logger.info("Starting data ingestion task...")
     try:
-        loader = container.document_loader
-        documents = loader.load_documents()
-
-        if not documents:
-            logger.warning("No documents found in data/ directory.")
+        stats = container.ingestion_pipeline.run()
+        if not stats["files_changed"] and not stats["files_removed"] and not stats["files_failed"]:
+            logger.info("No new, modified or deleted files found in data/ directory.")
             return
-
-        chunker = container.semantic_chunker
-        chunked_docs = chunker.chunk_documents(documents)
-
-        container.retriever.index_documents(chunked_docs)
-        logger.info(f"Indexed {len(chunked_docs)} chunks successfully.")
+        logger.info(f"Ingestion finished: {stats}")
     except Exception as e:
         logger.error(f"Ingestion failed: {e}")
 
@@ -91,7 +108,9 @@ async def upload_file(
 async def reset_knowledge_base():
     """Clear the vector database and reset the retriever."""
     try:
-        container.retriever.clear_index()
+        # Waits for a running ingestion instead of wiping the index under it
+        pipeline = await container.aget("ingestion_pipeline")
+        await asyncio.to_thread(pipeline.reset)
         logger.info("Knowledge base cleared upon user request.")
         return {"message": "Knowledge base cleared successfully."}
     except Exception as e:
@@ -111,36 +130,55 @@ async def ingest_data(background_tasks: BackgroundTasks):
 @router.post("/query", response_model=QueryResponse, status_code=200)
 async def query_llm(
     request: QueryRequest,
+    raw_request: Request,
     chat_service: ChatService = Depends(get_chat_service)
 ):
     try:
-        return await chat_service.process_query(request)
+        # Abandon retrieval and generation if the client goes away
+        return await run_until_disconnected(chat_service.process_query(request), raw_request.is_disconnected)
+    except ClientDisconnectedError:
+        logger.info("Client disconnected, cancelled query.")
+        container.request_counters.incr("query_cancelled")
+        # 499: client closed request (nobody reads it, but access logs do)
+        return Response(status_code=499)
     except HTTPException:
         raise
+    except ExecutorSaturatedError:
+        logger.warning("Retrieval executor saturated, rejecting query.")
+        raise HTTPException(status_code=503, detail="Server is busy, please retry shortly.")
     except Exception as e:
         logger.error(f"Unexpected error in query_llm: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 from fastapi.responses import StreamingResponse
 from app.models.schemas import ChatStreamRequest
+from app.core.sse import event_stream
 
 @router.post("/chat", status_code=200)
 async def chat_stream(
     request: ChatStreamRequest,
+    raw_request: Request,
     chat_service: ChatService = Depends(get_chat_service)
 ):
     """
     Streaming chat endpoint with history support.
+    Server-Sent Events: status, citations, token, usage, error, then done.
     """
     return StreamingResponse(
-        chat_service.stream_chat(request), 
-        media_type="text/event-stream"
+        event_stream(
+            chat_service.stream_chat(request),
+            raw_request.is_disconnected,
+            on_cancel=lambda: container.request_counters.incr("chat_cancelled")
+        ),
+        media_type="text/event-stream",
+        # Stop proxies (e.g. nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @router.get("/sessions", status_code=200)
 async def get_sessions(chat_service: ChatService = Depends(get_chat_service)):
     """List all active session IDs."""
-    return {"sessions": chat_service.memory_manager.get_all_sessions()}
+    return {"sessions": await asyncio.to_thread(chat_service.memory_manager.get_all_sessions)}
 
 @router.get("/sessions/{session_id}", status_code=200)
 async def get_session_history(
@@ -148,7 +186,7 @@ async def get_session_history(
     chat_service: ChatService = Depends(get_chat_service)
 ):
     """Get history for a specific session."""
-    history = chat_service.memory_manager.get_raw_history(session_id)
+    history = await asyncio.to_thread(chat_service.memory_manager.get_raw_history, session_id)
     if not history:
         raise HTTPException(status_code=404, detail="Session not found")
     return {"history": history}
@@ -165,18 +203,14 @@ async def clear_all_sessions(chat_service: ChatService = Depends(get_chat_servic
 
 @router.get("/models", status_code=200)
 async def get_models():
-    base_url = settings.LOCAL_LLM_URL.replace("/v1", "").rstrip("/")
     try:
-        async with httpx.AsyncClient(
-            timeout=httpx.Timeout(timeout=30.0)
-        ) as client:
-            res = await client.get(f"{base_url}/api/tags")
-            res.raise_for_status()
-            data = res.json()
-            return {
-                "count": len(data.get("models", [])),
-                "models": data.get("models", [])
-            }
+        res = await container.ollama_client.get("/api/tags", timeout=30.0)
+        res.raise_for_status()
+        data = res.json()
+        return {
+            "count": len(data.get("models", [])),
+            "models": data.get("models", [])
+        }
     except httpx.RequestError as e:
         logger.error(f"Ollama not reachable: {e}")
         raise HTTPException(503, "Ollama service unavailable")
@@ -190,24 +224,23 @@ from app.models.schemas import ModelPullRequest
 
 @router.post("/models/pull", status_code=200)
 async def pull_model(request: ModelPullRequest):
-    base_url = settings.LOCAL_LLM_URL.replace("/v1", "").rstrip("/")
-
     async def stream_pull():
         try:
-            async with httpx.AsyncClient(timeout=None) as client:
-                async with client.stream(
-                    "POST",
-                    f"{base_url}/api/pull",
-                    json={"name": request.name}
-                ) as response:
-                    if response.status_code != 200:
-                        error = await response.aread()
-                        yield f"data: {{\"error\": \"{error.decode()}\"}}\n\n"
-                        return
-
-                    async for line in response.aiter_lines():
-                        if line:
-                            yield f"data: {line}\n\n"
+            # Pulls can take minutes, so no read timeout
+            async with container.ollama_client.stream(
+                "POST",
+                "/api/pull",
+                json={"name": request.name},
+                timeout=httpx.Timeout(None, connect=settings.HTTP_CONNECT_TIMEOUT)
+            ) as response:
+                if response.status_code != 200:
+                    error = await response.aread()
+                    yield f"data: {{\"error\": \"{error.decode()}\"}}\n\n"
+                    return
+
+                async for line in response.aiter_lines():
+                    if line:
+                        yield f"data: {line}\n\n"
 
         except asyncio.CancelledError:
             logger.info("Client disconnected during model pull")
@@ -228,26 +261,26 @@ from app.models.schemas import ModelDeleteRequest
 
 @router.delete("/models", status_code=200)
 async def delete_model(request: ModelDeleteRequest):
-    base_url = settings.LOCAL_LLM_URL.replace("/v1", "").rstrip("/")
-
     if ":" not in request.name:
         raise HTTPException(400, "Model name must include tag (e.g. llama3:latest)")
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            res = await client.delete(
-                f"{base_url}/api/delete",
-                json={"name": request.name}
-            )
-
-            if res.status_code == 200:
-                return {"message": f"Model {request.name} deleted successfully"}
-
-            if res.status_code == 404:
-                raise HTTPException(404, "Model not found")
-
-            logger.error(f"Ollama delete failed: {res.text}")
-            raise HTTPException(res.status_code, res.text)
+        # httpx's delete() takes no body, so go through request()
+        res = await container.ollama_client.request(
+            "DELETE",
+            "/api/delete",
+            json={"name": request.name},
+            timeout=30.0
+        )
+
+        if res.status_code == 200:
+            return {"message": f"Model {request.name} deleted successfully"}
+
+        if res.status_code == 404:
+            raise HTTPException(404, "Model not found")
+
+        logger.error(f"Ollama delete failed: {res.text}")
+        raise HTTPException(res.status_code, res.text)
 
     except httpx.RequestError as e:
         logger.error(f"Ollama unreachable: {e}")
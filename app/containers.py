@@ -1,10 +1,30 @@
+import time
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Optional
 from app.core.config import settings
 from app.services.router import LLMRouter
 from app.services.retriever.hybrid import HybridRetriever
 from app.services.ingestion.loader import DocumentLoader
 from app.services.ingestion.chunker import SemanticChunkerService
+from app.services.ingestion.pipeline import IngestionPipeline
+from app.services.embeddings.cache import EmbeddingCache
+from app.services.embeddings.registry import ModelRegistry
+from app.services.inference import model_key
+from app.services.retriever.score_cache import RerankScoreCache
+from app.services.query_cache import SemanticQueryCache
+from app.services.query_expansion.expander import QueryExpander
+from app.services.query_expansion.cache import ExpansionCache
+from app.services.memory_manager import MemoryManager
+from app.services.chat_service import ChatService
+from app.core.executor import BoundedExecutor
+from app.core.metrics import Counters
+from app.core.http import HttpClientPool, ollama_base_url
 from app.core.logging import logger
 
+# Lazy components built by warm_up(), in dependency order; the app is ready once all exist
+WARMUP_COMPONENTS = ("retriever", "semantic_chunker", "ingestion_pipeline", "query_expander", "chat_service")
+
 class Container:
     """
     Simple Dependency Injection Container.
@@ -16,10 +36,158 @@ class Container:
     def __init__(self):
         logger.info("Initializing DI Container...")
         self.settings = settings
-        self.llm_router = LLMRouter()
-        self.retriever = HybridRetriever()
+        # Request-level events such as client disconnects
+        self.request_counters = Counters()
+        self.http_clients = HttpClientPool()
+        self.ollama_client = self.http_clients.client("ollama", ollama_base_url())
+        self.llm_router = LLMRouter(http_clients=self.http_clients)
+        # One pool for search and re-ranking, shared by all requests
+        self.retrieval_executor = BoundedExecutor(
+            settings.MAX_WORKERS,
+            settings.RETRIEVAL_QUEUE_SIZE,
+            name="retrieval"
+        )
+        # Chunking gets its own small pool so ingestion never queues ahead of queries
+        self.ingestion_executor = BoundedExecutor(
+            settings.INGESTION_WORKERS,
+            settings.INGESTION_WORKERS,
+            name="ingestion"
+        )
+        self.embedding_cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.embedding_cache = EmbeddingCache(
+                settings.EMBEDDING_CACHE_PATH,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES
+            )
+        # One shared, batched instance per embedding model; weights load on first use
+        self.models = ModelRegistry(embedding_cache=self.embedding_cache)
+        self.rerank_cache = None
+        if settings.RERANK_CACHE_ENABLED:
+            self.rerank_cache = RerankScoreCache(
+                model_key(settings.RERANKER_MODEL_NAME),
+                max_bytes=settings.RERANK_CACHE_MAX_MB * 1024 * 1024,
+                disk_path=settings.RERANK_CACHE_DISK_PATH
+            )
+        self.query_cache = None
+        if settings.QUERY_CACHE_ENABLED:
+            self.query_cache = SemanticQueryCache(
+                threshold=settings.QUERY_CACHE_THRESHOLD,
+                ttl=settings.QUERY_CACHE_TTL,
+                max_entries=settings.QUERY_CACHE_MAX_ENTRIES
+            )
         self.document_loader = DocumentLoader(max_workers=settings.MAX_WORKERS if hasattr(settings, 'MAX_WORKERS') else 4)
-        self.semantic_chunker = SemanticChunkerService()
+        # Long-lived request services; history is loaded from disk once here
+        self.memory_manager = MemoryManager(llm_router=self.llm_router)
+        self.expansion_cache = None
+        if settings.QUERY_EXPANSION_CACHE_ENABLED:
+            self.expansion_cache = ExpansionCache(
+                settings.QUERY_EXPANSION_CACHE_PATH,
+                max_entries=settings.QUERY_EXPANSION_CACHE_MAX_ENTRIES,
+                ttl=settings.QUERY_EXPANSION_CACHE_TTL
+            )
+
+        # Components that load models or indexes are built on first use (or by warm_up())
+        self._components: Dict[str, Any] = {}
+        # Reentrant because components build their dependencies while holding it
+        self._init_lock = threading.RLock()
+        # Build time of each lazy component in milliseconds
+        self.init_timings: Dict[str, float] = {}
+        self.warmup_error: Optional[str] = None
+
+    def _component(self, name: str, factory: Callable[[], Any]) -> Any:
+        component = self._components.get(name)
+        if component is None:
+            with self._init_lock:
+                component = self._components.get(name)
+                if component is None:
+                    start = time.perf_counter()
+                    component = factory()
+                    self.init_timings[name] = round((time.perf_counter() - start) * 1000, 1)
+                    self._components[name] = component
+                    logger.info(f"Initialized {name} in {self.init_timings[name]} ms")
+        return component
+
+    @property
+    def retriever(self) -> HybridRetriever:
+        return self._component("retriever", self._build_retriever)
+
+    def _build_retriever(self) -> HybridRetriever:
+        retriever = HybridRetriever(
+            executor=self.retrieval_executor,
+            rerank_cache=self.rerank_cache,
+            embeddings=self.models.embeddings(settings.EMBEDDING_MODEL_NAME),
+            rerank_scorer=self.models.cross_encoder(settings.RERANKER_MODEL_NAME) if settings.USE_RERANK else None
+        )
+        if self.query_cache is not None:
+            # Cached answers are grounded on the current documents, so drop them on reset or re-ingest
+            retriever.add_index_listener(self.query_cache.set_index_version)
+        return retriever
+
+    @property
+    def semantic_chunker(self) -> SemanticChunkerService:
+        return self._component("semantic_chunker", lambda: SemanticChunkerService(
+            executor=self.ingestion_executor,
+            embeddings=self.models.embeddings(settings.EMBEDDING_MODEL_NAME)
+        ))
+
+    @property
+    def ingestion_pipeline(self) -> IngestionPipeline:
+        return self._component("ingestion_pipeline", lambda: IngestionPipeline(
+            self.document_loader,
+            self.semantic_chunker,
+            self.retriever
+        ))
+
+    @property
+    def query_expander(self) -> QueryExpander:
+        return self._component("query_expander", lambda: QueryExpander(
+            self.llm_router,
+            cache=self.expansion_cache,
+            retriever=self.retriever
+        ))
+
+    @property
+    def chat_service(self) -> ChatService:
+        return self._component("chat_service", lambda: ChatService(
+            self.llm_router,
+            self.retriever,
+            query_cache=self.query_cache,
+            query_expander=self.query_expander,
+            memory_manager=self.memory_manager
+        ))
+
+    async def aget(self, name: str) -> Any:
+        """Returns a lazy component, building it off the event loop if needed."""
+        if name in self._components:
+            return self._components[name]
+        return await asyncio.to_thread(getattr, self, name)
+
+    def is_ready(self) -> bool:
+        return all(name in self._components for name in WARMUP_COMPONENTS)
+
+    async def warm_up(self):
+        """Builds the lazy components in dependency order, so each timing is its own."""
+        start = time.perf_counter()
+        try:
+            for name in WARMUP_COMPONENTS:
+                await self.aget(name)
+        except Exception as e:
+            self.warmup_error = str(e)
+            logger.error(f"Warm-up failed: {repr(e)}")
+            return
+        logger.info(f"Warm-up finished in {(time.perf_counter() - start):.2f}s")
+
+    async def shutdown(self):
+        """Releases provider clients, worker threads and pending history and cache writes."""
+        logger.info("Shutting down DI Container...")
+        await self.llm_router.close()
+        await self.http_clients.aclose()
+        self.retrieval_executor.shutdown()
+        self.ingestion_executor.shutdown()
+        self.models.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+        self.memory_manager.close()
 
     @classmethod
     def get_instance(cls):
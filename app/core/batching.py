@@ -0,0 +1,168 @@
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.metrics import Histogram
+from app.core.logging import logger
+
+# Buckets for the number of items per batch
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+class MicroBatcher:
+    """
+    Merges concurrent calls of a batch function into larger batches.
+
+    Callers submit lists of items; a single worker thread takes the oldest
+    pending call, keeps collecting calls while they fit in `max_batch_size`
+    items and that call has waited less than `max_wait` seconds, runs `fn` once on the
+    concatenated items and hands each caller its slice of the results.
+    Blocking calls of `max_batch_size` items or more gain nothing from merging
+    and run directly in the caller's thread; awaited ones never run on the event loop.
+    """
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+        name: str = "batcher"
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self._queue: "queue.Queue[Optional[Tuple[List[Any], Future, float]]]" = queue.Queue()
+        self._closed = False
+        # A call taken off the queue that didn't fit in the previous batch
+        self._carry: Optional[Tuple[List[Any], Future, float]] = None
+
+        self.batches = 0
+        self.bypassed = 0
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram()
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, items: List[Any]) -> Future:
+        """Queues `items` and returns a future of their results, in order."""
+        future: Future = Future()
+        if not items:
+            future.set_result([])
+            return future
+        if self._closed or len(items) >= self.max_batch_size:
+            self.bypassed += 1
+            try:
+                future.set_result(list(self.fn(items)))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._enqueue(items, future)
+
+    def _enqueue(self, items: List[Any], future: Future) -> Future:
+        self._queue.put((items, future, time.perf_counter()))
+        return future
+
+    def __call__(self, items: List[Any]) -> List[Any]:
+        """Blocking submit, for callers running in worker threads."""
+        return self.submit(items).result()
+
+    async def run(self, items: List[Any]) -> List[Any]:
+        """
+        Awaitable submit for the event loop; cancelling only drops this caller's results.
+        Calls too large to merge go to the worker as a batch of their own (or to a
+        thread once closed), so `fn` never blocks the loop.
+        """
+        if not items:
+            return []
+        if self._closed:
+            self.bypassed += 1
+            return list(await asyncio.to_thread(self.fn, items))
+        return await asyncio.wrap_future(self._enqueue(items, Future()))
+
+    def _collect(self, first: Tuple[List[Any], Future, float]) -> List[Tuple[List[Any], Future, float]]:
+        calls = [first]
+        size = len(first[0])
+        deadline = first[2] + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                call = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if call is None:
+                # Put the close marker back so the loop exits after this batch
+                self._queue.put(None)
+                break
+            if size + len(call[0]) > self.max_batch_size:
+                self._carry = call
+                break
+            calls.append(call)
+            size += len(call[0])
+        return calls
+
+    def _run(self):
+        while True:
+            first, self._carry = self._carry, None
+            if first is None:
+                first = self._queue.get()
+            if first is None:
+                self._drain()
+                return
+            calls = self._collect(first)
+
+            started = time.perf_counter()
+            # Callers that were cancelled while queued don't need results
+            calls = [call for call in calls if call[1].set_running_or_notify_cancel()]
+            if not calls:
+                continue
+            items = []
+            for call_items, _, enqueued_at in calls:
+                self.queue_wait.observe(started - enqueued_at)
+                items.extend(call_items)
+            self.batches += 1
+            self.batch_size.observe(len(items))
+
+            try:
+                results = list(self.fn(items))
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(items)} failed: {repr(e)}")
+                for _, future, _ in calls:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for call_items, future, _ in calls:
+                future.set_result(results[offset:offset + len(call_items)])
+                offset += len(call_items)
+
+    def _drain(self):
+        # Calls that raced with close() still get an answer
+        while True:
+            try:
+                call = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if call is not None and call[1].set_running_or_notify_cancel():
+                try:
+                    call[1].set_result(list(self.fn(call[0])))
+                except Exception as e:
+                    call[1].set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait": self.max_wait,
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "bypassed": self.bypassed,
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait": self.queue_wait.snapshot(),
+        }
+
+    def close(self):
+        """Stops the worker once queued calls are done; later calls run unbatched."""
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout=5)
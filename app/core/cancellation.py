@@ -0,0 +1,31 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+class ClientDisconnectedError(Exception):
+    """Raised when the client went away before its request finished."""
+
+async def run_until_disconnected(
+    coro: Awaitable,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_interval: float = 0.5
+) -> Any:
+    """
+    Runs `coro` while polling the client connection. Non-streaming endpoints
+    aren't cancelled by the server when the client leaves, so on disconnect
+    the work is cancelled here and ClientDisconnectedError is raised.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                raise ClientDisconnectedError()
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
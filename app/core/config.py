@@ -19,6 +19,9 @@ class Settings(BaseSettings):
     LOG_FILENAME: str = "app.log"
     LOG_LEVEL: str = "INFO"
 
+    # Load models and indexes in the background at startup instead of on the first request
+    WARMUP_ON_STARTUP: bool = True
+
     # --- Retriever Configuration ---
     # Embedding Model for Vector Search
     EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
@@ -26,6 +29,67 @@ class Settings(BaseSettings):
     # Re-ranking Model
     RERANKER_MODEL_NAME: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
     
+    # Disk-backed embedding cache shared by the chunker and the retriever
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "data/cache/embeddings.sqlite"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+
+    # Inference backend for the embedding and re-ranking models: "torch" or "onnx"
+    # (needs `optimum[onnxruntime]`). With ONNX_QUANTIZE the models are exported once to
+    # ONNX_EXPORT_DIR and dynamically quantized to int8 for ONNX_QUANTIZATION_CONFIG
+    # ("avx2", "avx512", "avx512_vnni" or "arm64").
+    INFERENCE_BACKEND: str = "torch"
+    ONNX_QUANTIZE: bool = False
+    ONNX_QUANTIZATION_CONFIG: str = "avx2"
+    ONNX_EXPORT_DIR: str = "data/onnx"
+    # Threads per forward pass and across concurrent ops; 0 keeps the runtime default
+    INFERENCE_INTRA_OP_THREADS: int = 0
+    INFERENCE_INTER_OP_THREADS: int = 0
+
+    # Concurrent embedding calls are merged into batches of up to this many texts,
+    # waiting at most EMBEDDING_BATCH_MAX_WAIT seconds for company
+    EMBEDDING_BATCHING: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 64
+    EMBEDDING_BATCH_MAX_WAIT: float = 0.005
+
+    # Concurrent re-ranking requests share cross-encoder forward passes of up to
+    # RERANK_BATCH_MAX_SIZE pairs, waiting at most RERANK_BATCH_MAX_WAIT seconds
+    RERANK_BATCHING: bool = True
+    RERANK_BATCH_MAX_SIZE: int = 64
+    RERANK_BATCH_MAX_WAIT: float = 0.005
+
+    # Cross-encoder score cache (memory budget in MB, optional SQLite tier)
+    RERANK_CACHE_ENABLED: bool = True
+    RERANK_CACHE_MAX_MB: int = 32
+    RERANK_CACHE_DISK_PATH: Optional[str] = None
+
+    # Semantic /query response cache: similarity threshold, TTL in seconds, max entries
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_THRESHOLD: float = 0.95
+    QUERY_CACHE_TTL: int = 3600
+    QUERY_CACHE_MAX_ENTRIES: int = 1000
+
+    # Dense index: "flat" (exact), "hnsw", "ivf", "ivfpq", "opq", or "auto" to pick by
+    # corpus size (flat up to ANN_FLAT_MAX_VECTORS, hnsw up to ANN_HNSW_MAX_VECTORS, then ivfpq)
+    VECTOR_INDEX_TYPE: str = "auto"
+    ANN_FLAT_MAX_VECTORS: int = 20_000
+    ANN_HNSW_MAX_VECTORS: int = 1_000_000
+    # Vectors sampled to train IVF centroids and PQ codebooks
+    ANN_TRAIN_SAMPLE: int = 100_000
+    # IVF lists (0 = about 4 * sqrt(vectors)) and PQ sub-quantizers (0 = one per 8 dimensions)
+    ANN_IVF_NLIST: int = 0
+    ANN_PQ_M: int = 0
+    ANN_HNSW_M: int = 32
+    ANN_HNSW_EF_CONSTRUCTION: int = 80
+    # Search effort: IVF lists probed / HNSW candidates explored; fast mode uses the cheaper values
+    ANN_NPROBE: int = 16
+    ANN_NPROBE_FAST: int = 4
+    ANN_EF_SEARCH: int = 64
+    ANN_EF_SEARCH_FAST: int = 16
+    # HNSW can't remove vectors: deletes are skipped at search time until this
+    # fraction of the index is deleted, then the index is rebuilt without them
+    ANN_HNSW_REBUILD_DELETED_RATIO: float = 0.2
+
     # Flags
     USE_RRF: bool = True
     USE_RERANK: bool = True
@@ -33,13 +97,62 @@ class Settings(BaseSettings):
     # Parameters
     RRF_K: int = 60
     TOP_K_RETRIEVAL: int = 50
+    # Documents kept after the single cross-query rerank in advanced mode
+    ADVANCED_MODE_TOP_K: int = 5
+
+    # Streaming advanced mode: seconds to wait for the full pipeline before generating
+    # from a first-pass context (original query only, fused without re-ranking).
+    # Covers QUERY_EXPANSION_DEADLINE plus retrieval and re-ranking of the expanded queries
+    STREAM_PROGRESSIVE: bool = True
+    STREAM_FIRST_PASS_BUDGET: float = 2.5
+
+    # /chat event stream: token coalescing (seconds / characters) and idle heartbeat (seconds)
+    SSE_FLUSH_INTERVAL: float = 0.05
+    SSE_FLUSH_CHARS: int = 64
+    SSE_HEARTBEAT_INTERVAL: float = 15.0
+
+    # --- Ingestion Configuration ---
+    # Pool chunk vectors from the chunker's sentence embeddings instead of re-embedding each chunk
+    CHUNK_EMBEDDING_POOLING: bool = True
 
     # --- Query Expansion Configuration ---
     USE_QUERY_EXPANSION: bool = True
     QUERY_EXPANSION_COUNT: int = 3
+    # "llm" asks the default provider; "local" expands from the indexes without a model call
+    QUERY_EXPANSION_STRATEGY: str = "llm"
+    # Local expansion: feedback docs per hit list, terms added per query, vocabulary terms embedded
+    LOCAL_EXPANSION_FEEDBACK_DOCS: int = 5
+    LOCAL_EXPANSION_TERMS_PER_QUERY: int = 3
+    LOCAL_EXPANSION_VOCAB_SIZE: int = 5000
+    # Seconds to wait for expanded queries before answering from the original query's results
+    QUERY_EXPANSION_DEADLINE: float = 2.0
+    # Persistent cache of expansions (TTL in seconds)
+    QUERY_EXPANSION_CACHE_ENABLED: bool = True
+    QUERY_EXPANSION_CACHE_PATH: str = "data/cache/expansions.sqlite"
+    QUERY_EXPANSION_CACHE_MAX_ENTRIES: int = 10_000
+    QUERY_EXPANSION_CACHE_TTL: int = 7 * 24 * 3600
+
+    # --- Conversation History Configuration ---
+    # Estimated tokens of history allowed in a prompt, including the rolling summary
+    HISTORY_TOKEN_BUDGET: int = 1000
+    HISTORY_SUMMARY_TOKENS: int = 250
+
+    # --- HTTP Client Configuration ---
+    # Pooled clients shared by all requests to an upstream (e.g. Ollama)
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 120.0
+    # Used only if the optional `h2` package is installed
+    HTTP2_ENABLED: bool = True
 
     # --- Performance Configuration ---
     MAX_WORKERS: int = 4
+    # Jobs allowed to wait for a retrieval worker before new requests are rejected
+    RETRIEVAL_QUEUE_SIZE: int = 32
+    # Chunking threads for ingestion, a separate pool so a large upload can't starve retrieval
+    INGESTION_WORKERS: int = 2
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,104 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List
+from app.core.metrics import Histogram
+from app.core.logging import logger
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when a job is submitted while all workers and queue slots are taken."""
+
+class BoundedExecutor:
+    """
+    Long-lived thread pool shared across requests.
+
+    At most `max_workers + max_queue` jobs may be in flight; beyond that,
+    non-blocking submissions are rejected with ExecutorSaturatedError so the
+    caller can shed load instead of queueing unboundedly.
+    """
+    def __init__(self, max_workers: int, max_queue: int, name: str = "executor"):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.wait_time = Histogram()
+
+    def submit(self, fn: Callable, *args, block: bool = False, **kwargs) -> Future:
+        """
+        Schedules `fn` on the pool. With block=False (request paths) a full
+        pool raises ExecutorSaturatedError; block=True (background work) waits for a slot.
+        """
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturatedError(f"{self.name} executor is saturated")
+
+        enqueued_at = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+
+        def run():
+            self.wait_time.observe(time.perf_counter() - enqueued_at)
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                self._slots.release()
+
+        def on_done(future: Future):
+            # A job cancelled while still queued never runs, so free its slot here
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+                    self.cancelled += 1
+                self._slots.release()
+
+        future = self._executor.submit(run)
+        future.add_done_callback(on_done)
+        return future
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Awaitable variant of submit() for use on the event loop.
+        Cancelling the awaiting task cancels the job if it hasn't started yet.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def map(self, fn: Callable, items: Iterable) -> List[Any]:
+        """Blocking, order-preserving map for background work such as ingestion."""
+        futures = [self.submit(fn, item, block=True) for item in items]
+        return [future.result() for future in futures]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "active": self.active,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "cancelled": self.cancelled,
+                "wait_time": self.wait_time.snapshot(),
+            }
+
+    def shutdown(self):
+        logger.info(f"Shutting down {self.name} executor")
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,77 @@
+import importlib.util
+from typing import Dict, List, Optional
+import httpx
+from app.core.config import settings
+from app.core.logging import logger
+
+def ollama_base_url() -> str:
+    # LOCAL_LLM_URL points at the OpenAI-compatible /v1 API; the native API lives at the root
+    return settings.LOCAL_LLM_URL.replace("/v1", "").rstrip("/")
+
+def _pool_connections(client: httpx.AsyncClient) -> Optional[List]:
+    """
+    The client's open connections, or None. httpx has no public API for pool state,
+    so this reads httpcore's pool defensively; other versions or transports get None.
+    """
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return None
+    return list(connections)
+
+class HttpClientPool:
+    """
+    One long-lived httpx.AsyncClient per upstream, so connections are kept
+    alive and reused across requests instead of being opened per call.
+    """
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._requests: Dict[str, int] = {}
+        # HTTP/2 needs the optional `h2` package
+        self.http2 = settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+    def client(self, name: str, base_url: str) -> httpx.AsyncClient:
+        if name not in self._clients:
+            async def count_request(request: httpx.Request):
+                self._requests[name] += 1
+
+            self._requests[name] = 0
+            self._clients[name] = httpx.AsyncClient(
+                base_url=base_url,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+                event_hooks={"request": [count_request]}
+            )
+            logger.info(f"Created pooled HTTP client '{name}' for {base_url} (http2={self.http2})")
+        return self._clients[name]
+
+    def stats(self) -> Dict[str, Dict]:
+        stats = {}
+        for name, client in self._clients.items():
+            # Connection counts are None when the pool can't be inspected
+            connections = idle = None
+            pooled = _pool_connections(client)
+            if pooled is not None:
+                connections = len(pooled)
+                idle = sum(1 for conn in pooled if getattr(conn, "is_idle", lambda: False)())
+            stats[name] = {
+                "requests": self._requests[name],
+                "connections": connections,
+                "idle_connections": idle,
+                "max_connections": settings.HTTP_MAX_CONNECTIONS,
+                "http2": self.http2,
+            }
+        return stats
+
+    async def aclose(self):
+        for name, client in self._clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Failed to close HTTP client '{name}': {e}")
+        self._clients.clear()
@@ -0,0 +1,88 @@
+import time
+import threading
+from typing import Any, Awaitable, Dict, Iterable
+
+# Default buckets for latencies, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histogram:
+    """
+    Minimal thread-safe histogram with fixed upper-bound buckets.
+    Exposed as plain JSON through the /metrics endpoint.
+    """
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = i
+                    break
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            buckets = {f"le_{bound:g}": count for bound, count in zip(self.buckets, self.counts)}
+            buckets["le_inf"] = self.counts[-1]
+            return {
+                "count": self.count,
+                "mean": self.sum / self.count if self.count else 0.0,
+                "max": self.max,
+                "buckets": buckets,
+            }
+
+class Counters:
+    """Named, thread-safe event counters (e.g. cancelled requests)."""
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+class StageTimings:
+    """
+    Start/end offsets of the stages of one request, relative to its start.
+    Recording windows rather than durations shows which stages overlapped.
+    """
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def _offset_ms(self) -> float:
+        return round((time.perf_counter() - self.started_at) * 1000, 1)
+
+    def start(self, name: str):
+        self.stages[name] = {"start_ms": self._offset_ms()}
+
+    def end(self, name: str):
+        self.stages[name]["end_ms"] = self._offset_ms()
+
+    def mark(self, name: str, event: str):
+        """Records a point inside a stage (e.g. the first streamed token) once."""
+        self.stages[name].setdefault(f"{event}_ms", self._offset_ms())
+
+    async def track(self, name: str, awaitable: Awaitable) -> Any:
+        self.start(name)
+        try:
+            return await awaitable
+        finally:
+            self.end(name)
+
+    def snapshot(self) -> Dict:
+        return {"total_ms": self._offset_ms(), "stages": dict(self.stages)}
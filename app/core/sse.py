@@ -0,0 +1,118 @@
+import json
+import time
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.logging import logger
+
+# SSE comment line; ignored by clients but keeps proxies from closing an idle connection
+HEARTBEAT = ": keep-alive\n\n"
+
+# How often to ask the server whether the client is still there while nothing is being sent
+DISCONNECT_POLL_INTERVAL = 1.0
+
+Event = Tuple[str, Dict[str, Any]]
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def event_stream(
+    events: AsyncIterator[Event],
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    flush_interval: float = settings.SSE_FLUSH_INTERVAL,
+    flush_chars: int = settings.SSE_FLUSH_CHARS,
+    heartbeat_interval: float = settings.SSE_HEARTBEAT_INTERVAL,
+    on_cancel: Optional[Callable[[], None]] = None
+) -> AsyncIterator[str]:
+    """
+    Frames (event, data) pairs as Server-Sent Events.
+
+    `token` events are coalesced until `flush_chars` characters are buffered or
+    the oldest buffered token is `flush_interval` seconds old. A heartbeat
+    comment is sent after `heartbeat_interval` seconds of silence. The stream
+    always ends with a `done` event. If the client goes away, the producer
+    (and with it the upstream LLM stream) is cancelled and `on_cancel` is called.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def pump():
+        try:
+            async for item in events:
+                await queue.put(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Event stream failed: {repr(e)}")
+            await queue.put(("error", {"message": str(e)}))
+        await queue.put(finished)
+
+    producer = asyncio.create_task(pump())
+    tokens = []
+    token_chars = 0
+    first_token_at = 0.0
+    last_sent = last_poll = time.monotonic()
+    completed = False
+
+    def flush_tokens() -> str:
+        nonlocal tokens, token_chars
+        frame = format_event("token", {"text": "".join(tokens)})
+        tokens, token_chars = [], 0
+        return frame
+
+    try:
+        while True:
+            now = time.monotonic()
+            wake_at = min(last_sent + heartbeat_interval, last_poll + DISCONNECT_POLL_INTERVAL)
+            if tokens:
+                wake_at = min(wake_at, first_token_at + flush_interval)
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=max(0.0, wake_at - now))
+            except asyncio.TimeoutError:
+                item = None
+
+            now = time.monotonic()
+            if is_disconnected is not None and now - last_poll >= DISCONNECT_POLL_INTERVAL:
+                last_poll = now
+                if await is_disconnected():
+                    logger.info("Client disconnected, cancelling stream")
+                    return
+
+            if item is finished:
+                if tokens:
+                    yield flush_tokens()
+                completed = True
+                yield format_event("done", {})
+                return
+
+            frames = []
+            if item is not None:
+                event, data = item
+                if event == "token":
+                    if not tokens:
+                        first_token_at = now
+                    tokens.append(data["text"])
+                    token_chars += len(data["text"])
+                else:
+                    # Keep ordering: buffered tokens go out before the next event
+                    if tokens:
+                        frames.append(flush_tokens())
+                    frames.append(format_event(event, data))
+
+            if tokens and (token_chars >= flush_chars or now - first_token_at >= flush_interval):
+                frames.append(flush_tokens())
+            if not frames and now - last_sent >= heartbeat_interval:
+                frames.append(HEARTBEAT)
+
+            if frames:
+                last_sent = now
+                yield "".join(frames)
+    finally:
+        # Runs on normal completion, client disconnect and server shutdown alike
+        if not completed and on_cancel is not None:
+            on_cancel()
+        producer.cancel()
+        try:
+            await producer
+        except (asyncio.CancelledError, Exception):
+            pass
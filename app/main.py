@@ -1,11 +1,24 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api import routes
+from app.containers import container
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The server accepts connections while models load; /ready reports when they're done
+    warmup = asyncio.create_task(container.warm_up()) if settings.WARMUP_ON_STARTUP else None
+    yield
+    if warmup is not None:
+        warmup.cancel()
+    await container.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    version=settings.VERSION
+    version=settings.VERSION,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -6,6 +6,8 @@ class QueryRequest(BaseModel):
     session_id: Optional[str] = None
     mode: Literal["fast", "simple", "advanced"] = "advanced"
     provider: Optional[Literal["groq", "local", "gemini", "openai"]] = None
+    # Query expansion strategy for advanced mode, defaults to QUERY_EXPANSION_STRATEGY
+    expansion: Optional[Literal["llm", "local"]] = None
 
 class Citation(BaseModel):
     content: str
@@ -30,6 +32,7 @@ class ChatStreamRequest(BaseModel):
     stream: bool = True
     use_rag: bool = True
     model: Optional[str] = None
+    expansion: Optional[Literal["llm", "local"]] = None
 
 class ModelPullRequest(BaseModel):
     name: str
@@ -1,31 +1,155 @@
 import time
-from typing import List
+import asyncio
+from typing import List, Optional, Tuple
 from fastapi import HTTPException
+from langchain_core.documents import Document
 from app.models.schemas import QueryRequest, QueryResponse, Citation, ChatStreamRequest
 from app.services.query_expansion.expander import QueryExpander
 from app.services.router import LLMRouter
 from app.services.retriever.hybrid import HybridRetriever
-from app.services.memory_manager import MemoryManager
+from app.services.memory_manager import MemoryManager, estimate_tokens
+from app.services.query_cache import SemanticQueryCache
+from app.core.config import settings
+from app.core.metrics import StageTimings
 from app.core.logging import logger
 
 class ChatService:
-    def __init__(self, llm_router: LLMRouter, retriever: HybridRetriever):
+    def __init__(
+        self,
+        llm_router: LLMRouter,
+        retriever: HybridRetriever,
+        query_cache: Optional[SemanticQueryCache] = None,
+        query_expander: Optional[QueryExpander] = None,
+        memory_manager: Optional[MemoryManager] = None
+    ):
         self.llm_router = llm_router
         self.retriever = retriever
-        self.query_expander = QueryExpander()
-        self.memory_manager = MemoryManager()
+        self.query_cache = query_cache
+        self.query_expander = query_expander or QueryExpander(llm_router)
+        self.memory_manager = memory_manager or MemoryManager(llm_router=llm_router)
+        self._background_tasks = set()
 
     def clear_all_sessions(self):
         self.memory_manager.clear_all_history()
 
+    async def _retrieve_advanced(
+        self,
+        query: str,
+        timings: StageTimings,
+        expansion_strategy: Optional[str] = None,
+        original: Optional[asyncio.Task] = None
+    ) -> Tuple[List[Document], List[str]]:
+        """
+        Expands the query and retrieves for the original query at the same time.
+        Expanded queries are searched once they arrive, unless expansion misses
+        QUERY_EXPANSION_DEADLINE, in which case the original query's candidates are used alone.
+        All candidate lists are then fused and reranked once against the original query.
+        `original` is an already started retrieval for the original query, owned by the caller.
+        """
+        owns_original = original is None
+        if owns_original:
+            original = self._start_original_retrieval(query, timings)
+        # Local expansion reads its feedback documents from the original retrieval
+        expansion = asyncio.create_task(timings.track(
+            "expansion", self.query_expander.generate_queries(query, expansion_strategy, original)
+        ))
+        try:
+            try:
+                queries = await asyncio.wait_for(expansion, timeout=settings.QUERY_EXPANSION_DEADLINE)
+            except asyncio.TimeoutError:
+                logger.warning(f"Query expansion missed the {settings.QUERY_EXPANSION_DEADLINE}s deadline, using the original query only")
+                timings.stages["expansion"]["timed_out"] = True
+                queries = [query]
+            logger.info(f"Generated {len(queries)} queries: {queries}")
+
+            expanded = [q for q in queries if q != query]
+            ranked_lists = []
+            if expanded:
+                ranked_lists = await timings.track("retrieval_expanded", self.retriever.gather_candidates(expanded))
+            ranked_lists = await asyncio.shield(original) + ranked_lists
+        finally:
+            # Don't leave work running if retrieval failed (e.g. executor saturated)
+            expansion.cancel()
+            if owns_original:
+                original.cancel()
+
+        final_docs = await timings.track(
+            "rerank",
+            self.retriever.fuse_and_rerank(ranked_lists, query, top_k=settings.ADVANCED_MODE_TOP_K)
+        )
+        return final_docs, queries
+
+    def _start_original_retrieval(self, query: str, timings: StageTimings) -> asyncio.Task:
+        return asyncio.create_task(
+            timings.track("retrieval_original", self.retriever.gather_candidates([query]))
+        )
+
+    async def _retrieve_progressive(
+        self,
+        query: str,
+        timings: StageTimings,
+        expansion_strategy: Optional[str] = None
+    ) -> Tuple[List[Document], bool]:
+        """
+        Runs the full advanced pipeline, but only waits STREAM_FIRST_PASS_BUDGET for it.
+        Past the budget, the original query's candidates (fused, not reranked)
+        become the context so generation can start. Returns (docs, first_pass).
+        """
+        original = self._start_original_retrieval(query, timings)
+        full = asyncio.create_task(self._retrieve_advanced(query, timings, expansion_strategy, original))
+        try:
+            docs, _ = await asyncio.wait_for(asyncio.shield(full), timeout=settings.STREAM_FIRST_PASS_BUDGET)
+            return docs, False
+        except asyncio.TimeoutError:
+            full.cancel()
+            ranked_lists = await original
+            docs = await timings.track(
+                "first_pass",
+                self.retriever.fuse_and_rerank(ranked_lists, query, top_k=settings.ADVANCED_MODE_TOP_K, rerank=False)
+            )
+            logger.info(f"Full retrieval missed the {settings.STREAM_FIRST_PASS_BUDGET}s budget, streaming from first-pass context")
+            return docs, True
+        finally:
+            full.cancel()
+            original.cancel()
+
     async def process_query(self, request: QueryRequest) -> QueryResponse:
         start_time = time.time()
+        timings = StageTimings()
         logger.info(f"Processing query: {request.text}")
 
-        # 0. Get History
-        history_context = self.memory_manager.get_history(request.session_id)
+        # 0. Get History, compacted to the token budget (SQLite reads, kept off the event loop)
+        history_context, history_metrics = await asyncio.to_thread(
+            self.memory_manager.build_history, request.session_id
+        )
         if history_context:
-            logger.info(f"Retrieved history for session {request.session_id}")
+            logger.info(
+                f"Retrieved history for session {request.session_id}: "
+                f"{history_metrics['history_tokens_raw']} -> {history_metrics['history_tokens']} tokens"
+            )
+
+        # Answers that depend on conversation history can't be shared between queries
+        query_vector = None
+        cache_provider = request.provider or settings.DEFAULT_LLM_PROVIDER
+        # Advanced-mode answers also depend on how the query was expanded
+        cache_mode = request.mode
+        if request.mode == "advanced":
+            cache_mode = f"advanced:{request.expansion or settings.QUERY_EXPANSION_STRATEGY}"
+        if self.query_cache is not None and not history_context:
+            # Taken before retrieval so an answer from a since-replaced index isn't cached
+            cache_index_version = self.query_cache.index_version
+            query_vector = await self.retriever.executor.run(self.retriever.embeddings.embed_query, request.text)
+            cached = self.query_cache.lookup(query_vector, cache_mode, cache_provider)
+            if cached is not None:
+                response, similarity = cached
+                if request.session_id:
+                    self.memory_manager.add_turn(request.session_id, request.text, response.answer)
+                latency = time.time() - start_time
+                logger.info(f"Query answered from cache (similarity {similarity:.3f}) in {latency:.4f}s")
+                return response.model_copy(update={
+                    "latency": latency,
+                    "metadata": {**(response.metadata or {}), "cache_hit": True, "cache_similarity": similarity},
+                })
 
         final_docs = []
         source_label = "LLM Only"
@@ -35,40 +159,20 @@ class ChatService:
 
         if request.mode == "fast":
              # Fast mode: Single query, no expansion, small K
-             final_docs = await self.retriever.retrieve(request.text, top_k=1)
+             final_docs = await timings.track("retrieval", self.retriever.retrieve(request.text, top_k=1, mode="fast"))
              source_label = "HybridRetriever (Fast Mode)"
              queries = [request.text]
 
         elif request.mode == "simple":
              # Simple mode: Single query, moderate K
-             final_docs = await self.retriever.retrieve(request.text, top_k=3)
+             final_docs = await timings.track("retrieval", self.retriever.retrieve(request.text, top_k=3))
              source_label = "HybridRetriever (Simple Mode)"
              queries = [request.text]
         
         else: # "advanced" (default)
              source_label = "HybridRetriever + Reranker + Expansion (Advanced Mode)"
-             # Use Query Expansion
-             queries = await self.query_expander.generate_queries(request.text)
-             logger.info(f"Generated {len(queries)} queries: {queries}")
-
-             # Retrieve for all queries concurrently
-             import asyncio
-
-             async def retrieve_single_query(query):
-                 return await self.retriever.retrieve(query)  # This calls RRF/Rerank internally per query
-
-             # Run all retrievals concurrently
-             retrieval_tasks = [retrieve_single_query(query) for query in queries]
-             all_retrieved_docs = await asyncio.gather(*retrieval_tasks)
-
-             # Combine results from all queries
-             unique_docs = {}
-             for docs_list in all_retrieved_docs:
-                 for doc in docs_list:
-                     if doc.page_content not in unique_docs:
-                         unique_docs[doc.page_content] = doc
-
-             final_docs = list(unique_docs.values())
+             # Retrieve for the original question while it is being expanded
+             final_docs, queries = await self._retrieve_advanced(request.text, timings, request.expansion)
 
         # Prepare context and citations
         context = ""
@@ -95,11 +199,12 @@ class ChatService:
             if history_context:
                 full_context = f"PREVIOUS CONVERSATION HISTORY:\n{history_context}\n\nRETRIEVED DOCUMENT CONTEXT:\n{context}"
             
-            answer = await llm_provider.generate(request.text, context=full_context)
+            answer = await timings.track("generation", llm_provider.generate(request.text, context=full_context))
             
-            # 5. Save to Memory
+            # 5. Save to Memory, then refresh the rolling summary off the request path
             if request.session_id:
                 self.memory_manager.add_turn(request.session_id, request.text, answer)
+                self._run_in_background(self.memory_manager.summarize(request.session_id))
 
         except Exception as e:
             logger.error(f"Generation failed: {e}")
@@ -108,27 +213,43 @@ class ChatService:
         latency = time.time() - start_time
         logger.info(f"Query processed in {latency:.4f}s")
 
-        return QueryResponse(
+        response = QueryResponse(
             answer=answer,
             source=source_label,
             model_used=llm_provider.__class__.__name__,
             latency=latency,
-            citations=citations
+            citations=citations,
+            metadata={"cache_hit": False, **history_metrics, "timings": timings.snapshot()}
         )
+        if query_vector is not None:
+            self.query_cache.store(query_vector, cache_mode, cache_provider, response, cache_index_version)
+        return response
+
+    def _run_in_background(self, coro):
+        # Keep a reference so the task isn't garbage collected before it finishes
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
     async def stream_chat(self, request: ChatStreamRequest):
+        """
+        Yields (event, data) pairs for the /chat event stream:
+        status, citations, token, usage and error. SSE framing is done by the route.
+        """
         logger.info(f"Processing stream chat with {len(request.messages)} messages")
         
         if not request.messages:
-             yield "Error: No messages provided."
+             yield "error", {"message": "No messages provided."}
              return
 
+        timings = StageTimings()
+
         # 1. Extract latest query
         last_message = request.messages[-1]
         user_query = last_message.content
         
         # 2. Contextualize (Memory)
-        yield "__STATUS__: Contextualizing query..."
+        yield "status", {"message": "Contextualizing query..."}
         llm_provider = self.llm_router.get_provider(request.provider)
         search_query = user_query
         
@@ -136,42 +257,24 @@ class ChatService:
         
         # 3. Retrieve & Rerank
         final_docs = []
+        first_pass = False
         if request.use_rag:
-            yield "__STATUS__: Searching knowledge base..."
+            yield "status", {"message": "Searching knowledge base..."}
             try:
                 # Mode-based retrieval
                 if request.mode == "fast":
-                    candidates = await self.retriever.retrieve(search_query, top_k=1)
-                    final_docs = candidates
+                    final_docs = await timings.track("retrieval", self.retriever.retrieve(search_query, top_k=1, mode="fast"))
                 
                 elif request.mode == "simple":
-                    candidates = await self.retriever.retrieve(search_query, top_k=3)
-                    final_docs = candidates
+                    final_docs = await timings.track("retrieval", self.retriever.retrieve(search_query, top_k=3))
 
-                else: # advanced
-                    yield "__STATUS__: Expanding queries & Reranking..."
-                    # 1. Expand
-                    queries = await self.query_expander.generate_queries(search_query)
-
-                    # 2. Retrieve for all queries concurrently
-                    import asyncio
-
-                    async def retrieve_single_query(query):
-                        return await self.retriever.retrieve(query, top_k=3)
+                elif settings.STREAM_PROGRESSIVE:
+                    # Start answering from a first-pass context if expansion and reranking are slow
+                    final_docs, first_pass = await self._retrieve_progressive(search_query, timings, request.expansion)
 
-                    # Run all retrievals concurrently
-                    retrieval_tasks = [retrieve_single_query(q) for q in queries]
-                    all_retrieved_docs = await asyncio.gather(*retrieval_tasks)
-
-                    # 3. Combine results from all queries
-                    unique_docs = {}
-                    for docs_list in all_retrieved_docs:
-                        for d in docs_list:
-                            if d.page_content not in unique_docs:
-                                unique_docs[d.page_content] = d
-
-                    # 4. Take top 5 unique
-                    final_docs = list(unique_docs.values())[:5]
+                else: # advanced
+                    yield "status", {"message": "Expanding queries & Reranking..."}
+                    final_docs, _ = await self._retrieve_advanced(search_query, timings, request.expansion)
 
             except Exception as e:
                 logger.error(f"Retrieval error: {e}")
@@ -179,23 +282,31 @@ class ChatService:
         context = ""
         if final_docs:
              context = "\n".join([d.page_content for d in final_docs])
+             # Citations are known before generation, so send them ahead of the answer
+             yield "citations", {"citations": [
+                 {"content": doc.page_content, "metadata": doc.metadata}
+                 for doc in final_docs
+             ]}
              
         # 4. Stream Response
-        yield "__STATUS__: Generating response..."
+        yield "status", {"message": "Generating response..."}
+        answer_chars = 0
         try:
+            timings.start("generation")
             async for chunk in llm_provider.stream_generate(search_query, context=context, model=request.model):
-                yield chunk
+                timings.mark("generation", "first_token")
+                answer_chars += len(chunk)
+                yield "token", {"text": chunk}
+            timings.end("generation")
             
-            # 5. Yield Citations Metadata
-            if final_docs:
-                import json
-                citations = [
-                    {"content": doc.page_content, "metadata": doc.metadata}
-                    for doc in final_docs
-                ]
-                yield "\n\n__METADATA__\n"
-                yield json.dumps(citations)
+            # 5. Usage: estimated token counts (~4 chars per token) and stage timings
+            yield "usage", {
+                "prompt_tokens_estimate": estimate_tokens(search_query) + estimate_tokens(context),
+                "completion_tokens_estimate": (answer_chars + 3) // 4,
+                "first_pass": first_pass,
+                "timings": timings.snapshot(),
+            }
 
         except Exception as e:
             logger.error(f"Streaming error: {repr(e)}")
-            yield f"Error: {str(e)}"
+            yield "error", {"message": str(e)}
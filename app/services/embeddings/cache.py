@@ -0,0 +1,229 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.core.logging import logger
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache.
+    Vectors are stored as float16 blobs in SQLite, keyed by a hash of
+    (model name, normalized text), with LRU eviction above `max_entries`.
+    New vectors and access times are queued and committed by a background
+    thread, several at a time, so lookups on the query path never write.
+    Queued vectors are visible to lookups straight away.
+    """
+    def __init__(self, path: str, max_entries: int = 200_000, flush_interval: float = 1.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending_vectors: Dict[str, bytes] = {}
+        self._pending_access: Dict[str, float] = {}
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = self._connect()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self.conn.commit()
+        self._count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._writer_conn = self._connect()
+        logger.info(f"Embedding cache opened at {path} with {self._count} entries")
+
+        self._thread = threading.Thread(target=self._run, name="embedding-cache", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        # Whitespace differences don't change the embedding meaningfully
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            stored = []
+            for key in keys:
+                blob = self._pending_vectors.get(key)
+                if blob is not None:
+                    found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+                else:
+                    stored.append(key)
+
+            # SQLite limits the number of bound parameters per statement
+            for i in range(0, len(stored), 500):
+                batch = stored[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+
+            # LRU bookkeeping is written later, with the next batch
+            now = time.time()
+            self._pending_access.update((key, now) for key in found)
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        if found:
+            self._wakeup.set()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        with self._lock:
+            for key, vector in items.items():
+                self._pending_vectors[key] = np.asarray(vector, dtype=np.float16).tobytes()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            closed = self._closed
+            if not closed:
+                # Let writes from concurrent requests join the same transaction
+                time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            # close() may have run during the sleep; its wakeup was just cleared
+            closed = self._closed
+            try:
+                self._flush()
+            except Exception as e:
+                logger.error(f"Embedding cache write failed: {e}")
+                if not closed:
+                    time.sleep(1.0)
+                    self._wakeup.set()
+            if closed:
+                return
+
+    def _flush(self):
+        with self._lock:
+            vectors = dict(self._pending_vectors)
+            access = dict(self._pending_access)
+        if not vectors and not access:
+            return
+
+        conn = self._writer_conn
+        now = time.time()
+        try:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, blob, access.get(key, now)) for key, blob in vectors.items()]
+            )
+            added = max(cursor.rowcount, 0)
+            conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(last_access, key) for key, last_access in access.items()]
+            )
+            count = self._count + added
+            if count > self.max_entries:
+                count = self._evict(count)
+        except Exception:
+            conn.rollback()
+            raise
+
+        # Commit and dequeue together so lookups always find a vector in one of the two
+        with self._lock:
+            conn.commit()
+            self._count = count
+            for key in vectors:
+                self._pending_vectors.pop(key, None)
+            for key, last_access in access.items():
+                if self._pending_access.get(key) == last_access:
+                    del self._pending_access[key]
+
+    def _evict(self, count: int) -> int:
+        # Evict a little below the cap so we don't evict on every insert
+        target = int(self.max_entries * 0.9)
+        excess = count - target
+        self._writer_conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (excess,)
+        )
+        logger.info(f"Embedding cache evicted {excess} least recently used entries")
+        return self._writer_conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        """Commits queued vectors and access times, then closes the database."""
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=10)
+        self._writer_conn.close()
+        self.conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": self._count, "hits": self.hits, "misses": self.misses}
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model so that only texts missing from the cache reach the model.
+    """
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+
+    def _embed(self, keys: List[str], texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(set(keys))
+
+        # Embed each distinct missing text once, in a single model call
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            embedded = self.embeddings.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), embedded))
+            self.cache.put_many(new_vectors)
+            # Round-trip through float16 so a miss returns exactly what a later hit will
+            vectors.update({
+                key: np.asarray(vector, dtype=np.float16).astype(np.float32)
+                for key, vector in new_vectors.items()
+            })
+
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed([self.cache.make_key(self.model_name, text) for text in texts], texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries may be encoded differently from documents, so they get their own key space
+        key = self.cache.make_key(f"{self.model_name}:query", text)
+        found = self.cache.get_many([key])
+        if key in found:
+            return found[key].tolist()
+
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many({key: vector})
+        return np.asarray(vector, dtype=np.float16).astype(np.float32).tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Batched embed_query. Misses are embedded in one embed_documents call, which
+        matches embed_query for symmetric models such as the sentence-transformers defaults.
+        """
+        return self._embed([self.cache.make_key(f"{self.model_name}:query", text) for text in texts], texts)
@@ -0,0 +1,89 @@
+import threading
+from typing import Any, Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from app.core.batching import MicroBatcher
+from app.core.config import settings
+from app.services.inference import load_embeddings, model_key
+from app.services.embeddings.cache import EmbeddingCache, CachedEmbeddings
+from app.services.retriever.reranker import cross_encoder_scorer
+from app.core.logging import logger
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Routes embed calls through a micro-batcher, so texts embedded concurrently
+    by different requests share one forward pass.
+    """
+    def __init__(self, embeddings: Embeddings, model_name: str, max_batch_size: int, max_wait: float):
+        self.embeddings = embeddings
+        self.batcher = MicroBatcher(
+            embeddings.embed_documents, max_batch_size, max_wait, name=f"embed:{model_name}"
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.batcher(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        # Queries join document batches; this matches embed_query for symmetric
+        # models such as the sentence-transformers defaults (see CachedEmbeddings.embed_queries)
+        return self.batcher([text])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return self.batcher.stats()
+
+    def close(self):
+        self.batcher.close()
+
+class ModelRegistry:
+    """
+    Hands out one shared instance per model name, loaded on first request:
+    embedding models wrapped with micro-batching and the embedding cache, and
+    micro-batched cross-encoder scorers.
+    """
+    def __init__(
+        self,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        batching: bool = settings.EMBEDDING_BATCHING,
+        max_batch_size: int = settings.EMBEDDING_BATCH_MAX_SIZE,
+        max_wait: float = settings.EMBEDDING_BATCH_MAX_WAIT
+    ):
+        self.embedding_cache = embedding_cache
+        self.batching = batching
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._embeddings: Dict[str, Embeddings] = {}
+        self._batched: Dict[str, BatchedEmbeddings] = {}
+        self._scorers: Dict[str, MicroBatcher] = {}
+        self._lock = threading.Lock()
+
+    def embeddings(self, model_name: str = settings.EMBEDDING_MODEL_NAME) -> Embeddings:
+        with self._lock:
+            if model_name not in self._embeddings:
+                logger.info(f"Loading embedding model {model_name}")
+                embeddings: Embeddings = load_embeddings(model_name)
+                if self.batching:
+                    embeddings = self._batched[model_name] = BatchedEmbeddings(
+                        embeddings, model_name, self.max_batch_size, self.max_wait
+                    )
+                # The cache sits in front so only misses are batched and embedded
+                if self.embedding_cache is not None:
+                    embeddings = CachedEmbeddings(embeddings, model_key(model_name), self.embedding_cache)
+                self._embeddings[model_name] = embeddings
+            return self._embeddings[model_name]
+
+    def cross_encoder(self, model_name: str = settings.RERANKER_MODEL_NAME) -> MicroBatcher:
+        with self._lock:
+            if model_name not in self._scorers:
+                logger.info(f"Loading cross-encoder {model_name}")
+                self._scorers[model_name] = cross_encoder_scorer(model_name)
+            return self._scorers[model_name]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {name: batched.stats() for name, batched in self._batched.items()}
+        stats.update({name: scorer.stats() for name, scorer in self._scorers.items()})
+        return stats
+
+    def close(self):
+        for batched in self._batched.values():
+            batched.close()
+        for scorer in self._scorers.values():
+            scorer.close()
@@ -0,0 +1,129 @@
+import os
+import threading
+import functools
+import importlib.util
+import importlib.metadata
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.logging import logger
+
+_lock = threading.Lock()
+_threads_configured = False
+
+# First sentence-transformers release whose CrossEncoder takes backend="onnx"
+# (SentenceTransformer has since 3.2, with export_dynamic_quantized_onnx_model)
+MIN_ONNX_SENTENCE_TRANSFORMERS = (4, 1)
+
+def _sentence_transformers_version() -> Tuple[int, ...]:
+    version = importlib.metadata.version("sentence-transformers")
+    return tuple(int(part) for part in version.split(".")[:2] if part.isdigit())
+
+@functools.lru_cache(maxsize=None)
+def backend() -> str:
+    """The inference backend in use: INFERENCE_BACKEND, or "torch" if ONNX Runtime isn't installed."""
+    if settings.INFERENCE_BACKEND == "onnx":
+        # ONNX support in sentence-transformers needs the optional `optimum` and `onnxruntime` packages
+        if importlib.util.find_spec("onnxruntime") is None or importlib.util.find_spec("optimum") is None:
+            logger.warning("INFERENCE_BACKEND=onnx but onnxruntime/optimum aren't installed, using torch")
+            return "torch"
+        if _sentence_transformers_version() < MIN_ONNX_SENTENCE_TRANSFORMERS:
+            logger.warning(
+                f"INFERENCE_BACKEND=onnx needs sentence-transformers >= "
+                f"{'.'.join(map(str, MIN_ONNX_SENTENCE_TRANSFORMERS))}, using torch"
+            )
+            return "torch"
+        return "onnx"
+    return "torch"
+
+def model_key(model_name: str) -> str:
+    """
+    Identifies a model together with its backend. ONNX and int8 outputs differ
+    slightly from PyTorch fp32, so caches of vectors and scores are keyed by this.
+    """
+    if backend() == "torch":
+        return model_name
+    if settings.ONNX_QUANTIZE:
+        return f"{model_name}@onnx-qint8-{settings.ONNX_QUANTIZATION_CONFIG}"
+    return f"{model_name}@onnx"
+
+def configure_threads():
+    """Applies INFERENCE_INTRA_OP_THREADS / INFERENCE_INTER_OP_THREADS to PyTorch, once per process."""
+    global _threads_configured
+    with _lock:
+        if _threads_configured:
+            return
+        _threads_configured = True
+    if settings.INFERENCE_INTRA_OP_THREADS <= 0 and settings.INFERENCE_INTER_OP_THREADS <= 0:
+        return
+    import torch
+    if settings.INFERENCE_INTRA_OP_THREADS > 0:
+        torch.set_num_threads(settings.INFERENCE_INTRA_OP_THREADS)
+    if settings.INFERENCE_INTER_OP_THREADS > 0:
+        try:
+            torch.set_num_interop_threads(settings.INFERENCE_INTER_OP_THREADS)
+        except RuntimeError as e:
+            # Only allowed before PyTorch runs any parallel work
+            logger.warning(f"Could not set inter-op threads: {e}")
+
+def _session_options():
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    if settings.INFERENCE_INTRA_OP_THREADS > 0:
+        options.intra_op_num_threads = settings.INFERENCE_INTRA_OP_THREADS
+    if settings.INFERENCE_INTER_OP_THREADS > 0:
+        options.inter_op_num_threads = settings.INFERENCE_INTER_OP_THREADS
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+def _export_dir(model_name: str) -> str:
+    return os.path.join(settings.ONNX_EXPORT_DIR, model_name.replace("/", "__"))
+
+def _quantized_model(model_cls, model_name: str) -> str:
+    """
+    Exports `model_name` to ONNX and quantizes it to int8 once, under ONNX_EXPORT_DIR.
+    Returns the local model directory; later loads reuse the files.
+    """
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    path = _export_dir(model_name)
+    config = settings.ONNX_QUANTIZATION_CONFIG
+    with _lock:
+        if not os.path.exists(os.path.join(path, "onnx", f"model_qint8_{config}.onnx")):
+            logger.info(f"Exporting {model_name} to ONNX and quantizing to int8 ({config}) in {path}")
+            model = model_cls(model_name, backend="onnx")
+            model.save_pretrained(path)
+            export_dynamic_quantized_onnx_model(model, config, path)
+    return path
+
+def _onnx_model(model_cls, model_name: str) -> Tuple[str, Dict[str, Any]]:
+    """Model path and constructor arguments that load `model_name` with ONNX Runtime, quantized if configured."""
+    model_kwargs: Dict[str, Any] = {
+        "provider": "CPUExecutionProvider",
+        "session_options": _session_options(),
+    }
+    if settings.ONNX_QUANTIZE:
+        model_kwargs["file_name"] = f"onnx/model_qint8_{settings.ONNX_QUANTIZATION_CONFIG}.onnx"
+        model_name = _quantized_model(model_cls, model_name)
+    return model_name, {"backend": "onnx", "model_kwargs": model_kwargs}
+
+def load_embeddings(model_name: str, backend_name: Optional[str] = None):
+    """HuggingFaceEmbeddings for `model_name` running on the configured backend (or `backend_name`)."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    if (backend_name or backend()) == "onnx":
+        from sentence_transformers import SentenceTransformer
+        path, kwargs = _onnx_model(SentenceTransformer, model_name)
+        # HuggingFaceEmbeddings passes model_kwargs through to SentenceTransformer
+        return HuggingFaceEmbeddings(model_name=path, model_kwargs=kwargs)
+    configure_threads()
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+def load_cross_encoder(model_name: str, backend_name: Optional[str] = None):
+    """CrossEncoder for `model_name` running on the configured backend (or `backend_name`)."""
+    from sentence_transformers import CrossEncoder
+
+    if (backend_name or backend()) == "onnx":
+        path, kwargs = _onnx_model(CrossEncoder, model_name)
+        return CrossEncoder(path, **kwargs)
+    configure_threads()
+    return CrossEncoder(model_name)
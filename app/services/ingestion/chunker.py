@@ -1,43 +1,130 @@
-from typing import List
+import re
+from typing import List, Optional, Tuple
+import numpy as np
 from langchain_experimental.text_splitter import SemanticChunker
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from app.core.config import settings
+from app.services.embeddings.cache import EmbeddingCache, CachedEmbeddings
+from app.services.inference import load_embeddings, model_key
+from app.core.executor import BoundedExecutor
 import logging
-from concurrent.futures import ThreadPoolExecutor
 from itertools import islice
 
 logger = logging.getLogger(__name__)
 
 class SemanticChunkerService:
-    def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+    def __init__(
+        self,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        executor: Optional[BoundedExecutor] = None,
+        embeddings: Optional[Embeddings] = None
+    ):
+        # Prefer the registry's shared model so its weights aren't loaded twice
+        if embeddings is not None:
+            self.embeddings = embeddings
+        else:
+            self.embeddings = load_embeddings(settings.EMBEDDING_MODEL_NAME)
+            if embedding_cache is not None:
+                self.embeddings = CachedEmbeddings(self.embeddings, model_key(settings.EMBEDDING_MODEL_NAME), embedding_cache)
         self.splitter = SemanticChunker(
             self.embeddings,
             breakpoint_threshold_type="percentile"
         )
+        self.pool_embeddings = settings.CHUNK_EMBEDDING_POOLING
+        self.executor = executor
 
     def chunk_documents(self, documents: List[Document]) -> List[Document]:
+        chunks, _ = self.chunk_documents_with_embeddings(documents)
+        return chunks
+
+    def chunk_documents_with_embeddings(self, documents: List[Document]) -> Tuple[List[Document], List[List[float]]]:
+        """
+        Splits documents at semantic breakpoints and returns each chunk together
+        with its vector, so the indexer never has to embed the chunks again.
+        """
         logger.info(f"Chunking {len(documents)} documents using SemanticChunker")
 
         # For large document lists, we can process them in batches to improve performance
-        if len(documents) > 10:  # Only use multithreading for larger document sets
+        if len(documents) > 10 and self.executor:  # Only use multithreading for larger document sets
             # Split documents into smaller batches
-            batch_size = max(1, len(documents) // settings.MAX_WORKERS)
+            batch_size = max(1, len(documents) // self.executor.max_workers)
             batches = [list(islice(documents, i, i + batch_size))
                       for i in range(0, len(documents), batch_size)]
 
-            # Process batches concurrently
-            all_chunks = []
-            with ThreadPoolExecutor(max_workers=settings.MAX_WORKERS) as executor:
-                batch_chunks = list(executor.map(self.splitter.split_documents, batches))
-                for chunk_batch in batch_chunks:
-                    all_chunks.extend(chunk_batch)
-
-            chunks = all_chunks
+            # Process batches concurrently on the ingestion pool
+            chunks, vectors = [], []
+            for batch_chunks, batch_vectors in self.executor.map(self._split_documents, batches):
+                chunks.extend(batch_chunks)
+                vectors.extend(batch_vectors)
         else:
             # For smaller sets, use the standard approach
-            chunks = self.splitter.split_documents(documents)
+            chunks, vectors = self._split_documents(documents)
 
         logger.info(f"Created {len(chunks)} chunks")
-        return chunks
+        return chunks, vectors
+
+    def _split_documents(self, documents: List[Document]) -> Tuple[List[Document], List[List[float]]]:
+        chunks, pending = [], []
+        vectors = []
+        for doc in documents:
+            for text, vector in self._split_text(doc.page_content):
+                chunks.append(Document(page_content=text, metadata=dict(doc.metadata)))
+                vectors.append(vector)
+                if vector is None:
+                    pending.append(len(vectors) - 1)
+
+        # Chunks without a pooled vector are embedded in one batched pass
+        if pending:
+            embedded = self.embeddings.embed_documents([chunks[i].page_content for i in pending])
+            for i, vector in zip(pending, embedded):
+                vectors[i] = vector
+
+        return chunks, vectors
+
+    def _split_text(self, text: str) -> List[Tuple[str, List[float]]]:
+        """
+        Same breakpoint logic as SemanticChunker (percentile threshold over the
+        cosine distances of buffered sentence windows), but keeps the window
+        embeddings so each chunk's vector can be pooled from them.
+        """
+        sentences = [s for s in re.split(self.splitter.sentence_split_regex, text) if s.strip()]
+        if len(sentences) <= 1:
+            return [(text, None)] if text.strip() else []
+
+        # Each sentence is embedded together with its neighbours (buffer of 1)
+        buffer = self.splitter.buffer_size
+        windows = [
+            " ".join(sentences[max(0, i - buffer):i + buffer + 1])
+            for i in range(len(sentences))
+        ]
+        window_vectors = np.asarray(self.embeddings.embed_documents(windows), dtype=np.float32)
+
+        norms = np.linalg.norm(window_vectors, axis=1)
+        unit = window_vectors / np.maximum(norms, 1e-12)[:, None]
+        distances = 1.0 - np.sum(unit[:-1] * unit[1:], axis=1)
+
+        amount = self.splitter.breakpoint_threshold_amount
+        if amount is None:
+            amount = 95
+        threshold = np.percentile(distances, amount)
+        breakpoints = [i for i, distance in enumerate(distances) if distance > threshold]
+
+        groups, start = [], 0
+        for index in breakpoints + [len(sentences) - 1]:
+            if index < start:
+                continue
+            groups.append((start, index + 1))
+            start = index + 1
+
+        results = []
+        for start, end in groups:
+            chunk_text = " ".join(sentences[start:end])
+            if not self.pool_embeddings:
+                results.append((chunk_text, None))
+                continue
+            # Mean of the window vectors, rescaled to the model's typical norm
+            pooled = window_vectors[start:end].mean(axis=0)
+            pooled *= norms[start:end].mean() / max(np.linalg.norm(pooled), 1e-12)
+            results.append((chunk_text, pooled.tolist()))
+        return results
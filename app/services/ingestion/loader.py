@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Dict
 from langchain_community.document_loaders import PyPDFLoader, CSVLoader, Docx2txtLoader
 from langchain_core.documents import Document
 import logging
@@ -39,24 +39,28 @@ class DocumentLoader:
                 return []
         except Exception as e:
             logger.error(f"Error loading {file_path}: {e}")
-            return []
+            # Callers must be able to tell a failed load from an empty file
+            raise
 
-    def load_documents(self) -> List[Document]:
-        logger.info(f"Starting document loading from: {self.data_dir} with {self.max_workers} workers")
-
-        # Collect all file paths first
+    def list_files(self) -> List[str]:
+        """Collect all supported file paths under the data directory."""
         file_paths = []
         for root, _, files in os.walk(self.data_dir):
             for file in files:
-                file_path = os.path.join(root, file)
+                file_path = os.path.normpath(os.path.join(root, file))
                 file_ext = os.path.splitext(file)[1].lower()
                 if file_ext in [".pdf", ".csv", ".docx", ".doc"]:
                     file_paths.append(file_path)
+        return file_paths
 
-        logger.info(f"Found {len(file_paths)} files to process")
+    def load_files(self, file_paths: List[str]) -> Dict[str, List[Document]]:
+        """
+        Load the given files concurrently, returning their documents keyed by path.
+        Files that fail to load are left out.
+        """
+        logger.info(f"Loading {len(file_paths)} files with {self.max_workers} workers")
 
-        # Process files concurrently
-        documents = []
+        documents_by_file = {}
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             # Submit all tasks
             future_to_path = {
@@ -68,10 +72,22 @@ class DocumentLoader:
             for future in as_completed(future_to_path):
                 file_path = future_to_path[future]
                 try:
-                    docs = future.result()
-                    documents.extend(docs)
-                except Exception as e:
-                    logger.error(f"Error processing {file_path}: {e}")
+                    documents_by_file[file_path] = future.result()
+                except Exception:
+                    # Already logged by _load_single_file
+                    continue
+
+        return documents_by_file
+
+    def load_documents(self) -> List[Document]:
+        logger.info(f"Starting document loading from: {self.data_dir} with {self.max_workers} workers")
+
+        file_paths = self.list_files()
+        logger.info(f"Found {len(file_paths)} files to process")
+
+        documents = []
+        for docs in self.load_files(file_paths).values():
+            documents.extend(docs)
 
         logger.info(f"Total documents loaded: {len(documents)}")
         return documents
@@ -0,0 +1,85 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class IngestionManifest:
+    """
+    Persistent record of ingested files.
+    Maps each file path to its size, mtime, content hash and the IDs of the
+    chunks produced from it, so re-ingestion only touches what changed.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading ingestion manifest, starting fresh: {e}")
+                self.entries = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write to a temp file first so a crash never leaves a truncated manifest
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def diff(self, file_paths: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+        """
+        Compares the files currently on disk against the manifest.
+
+        Returns:
+            changed: path -> {size, mtime, hash} for new or modified files.
+            removed: paths that are in the manifest but no longer on disk.
+        """
+        changed = {}
+        current = set()
+        for file_path in file_paths:
+            current.add(file_path)
+            stat = os.stat(file_path)
+            entry = self.entries.get(file_path)
+
+            # Cheap check first: unchanged size and mtime means no need to hash
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                continue
+
+            file_hash = self.hash_file(file_path)
+            if entry and entry["hash"] == file_hash:
+                # Touched but identical content, just refresh the stat info
+                entry["size"] = stat.st_size
+                entry["mtime"] = stat.st_mtime
+                continue
+
+            changed[file_path] = {"size": stat.st_size, "mtime": stat.st_mtime, "hash": file_hash}
+
+        removed = [path for path in self.entries if path not in current]
+        return changed, removed
+
+    def chunk_ids(self, file_path: str) -> List[str]:
+        entry = self.entries.get(file_path)
+        return list(entry["chunk_ids"]) if entry else []
+
+    def record(self, file_path: str, info: Dict, chunk_ids: List[str]):
+        self.entries[file_path] = {**info, "chunk_ids": chunk_ids}
+
+    def remove(self, file_path: str) -> List[str]:
+        entry = self.entries.pop(file_path, None)
+        return entry["chunk_ids"] if entry else []
@@ -0,0 +1,117 @@
+import os
+import hashlib
+import threading
+from typing import Dict, List, Tuple
+from collections import defaultdict
+from langchain_core.documents import Document
+from app.services.ingestion.loader import DocumentLoader
+from app.services.ingestion.chunker import SemanticChunkerService
+from app.services.ingestion.manifest import IngestionManifest
+from app.services.retriever.hybrid import HybridRetriever, INDEX_DIR
+import logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = os.path.join(INDEX_DIR, "manifest.json")
+
+class IngestionPipeline:
+    """
+    Incremental ingestion: only new or modified files are loaded, chunked and
+    embedded, and chunks belonging to deleted or modified files are removed
+    from the indexes.
+    """
+    def __init__(
+        self,
+        loader: DocumentLoader,
+        chunker: SemanticChunkerService,
+        retriever: HybridRetriever,
+        manifest_path: str = MANIFEST_PATH
+    ):
+        self.loader = loader
+        self.chunker = chunker
+        self.retriever = retriever
+        self.manifest_path = manifest_path
+        # Uploads can trigger overlapping runs; they must not interleave
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Clears the indexes and the manifest, once any run in progress has finished."""
+        with self._lock:
+            self.retriever.clear_index()
+
+    def run(self) -> Dict[str, int]:
+        with self._lock:
+            # Re-read on every run: /reset wipes the index directory, manifest included
+            manifest = IngestionManifest(self.manifest_path)
+
+            if not manifest.entries and self.retriever.has_documents():
+                # Index predates the manifest, its chunks can't be attributed to files
+                logger.info("Index has no ingestion manifest, rebuilding from scratch.")
+                self.retriever.clear_index()
+
+            changed, removed = manifest.diff(self.loader.list_files())
+            logger.info(f"Ingestion diff: {len(changed)} new/modified, {len(removed)} removed files")
+
+            # Load and chunk before touching the index: a file that fails to load
+            # keeps its previous chunks and manifest entry, and is retried next run
+            loaded: Dict[str, List[str]] = {}
+            new_chunks, new_ids, new_vectors = [], [], []
+            if changed:
+                documents_by_file = self.loader.load_files(list(changed))
+                failed = [file_path for file_path in changed if file_path not in documents_by_file]
+                if failed:
+                    logger.warning(f"{len(failed)} files failed to load, keeping their indexed chunks: {failed}")
+
+                documents = []
+                for file_path, docs in documents_by_file.items():
+                    for doc in docs:
+                        # Chunks are grouped back to their file via this key
+                        doc.metadata["source"] = file_path
+                    documents.extend(docs)
+
+                chunks, vectors = [], []
+                if documents:
+                    chunks, vectors = self.chunker.chunk_documents_with_embeddings(documents)
+                chunks_by_file: Dict[str, List[Tuple[Document, List[float]]]] = defaultdict(list)
+                for chunk, vector in zip(chunks, vectors):
+                    chunks_by_file[chunk.metadata["source"]].append((chunk, vector))
+
+                for file_path in documents_by_file:
+                    info = changed[file_path]
+                    prefix = hashlib.sha1(f"{file_path}:{info['hash']}".encode()).hexdigest()[:16]
+                    chunk_ids = []
+                    for i, (chunk, vector) in enumerate(chunks_by_file.get(file_path, [])):
+                        chunk_id = f"{prefix}-{i}"
+                        chunk.metadata["chunk_id"] = chunk_id
+                        chunk_ids.append(chunk_id)
+                        new_chunks.append(chunk)
+                        new_ids.append(chunk_id)
+                        new_vectors.append(vector)
+                    loaded[file_path] = chunk_ids
+
+            # The new chunks are ready, so swap them in for the stale ones
+            stale_ids = []
+            for file_path in removed:
+                stale_ids.extend(manifest.remove(file_path))
+            for file_path in loaded:
+                stale_ids.extend(manifest.chunk_ids(file_path))
+            self.retriever.delete_documents(stale_ids)
+
+            # Vectors come from the chunker, the retriever doesn't embed them again
+            self.retriever.add_documents(new_chunks, new_ids, new_vectors)
+            for file_path, chunk_ids in loaded.items():
+                manifest.record(file_path, changed[file_path], chunk_ids)
+
+            if loaded or removed:
+                self.retriever.save_index()
+            manifest.save()
+
+            stats = {
+                "files_changed": len(loaded),
+                "files_failed": len(changed) - len(loaded),
+                "files_removed": len(removed),
+                "chunks_added": len(new_chunks),
+                "chunks_removed": len(stale_ids),
+            }
+            logger.info(f"Ingestion complete: {stats}")
+            return stats
@@ -15,3 +15,9 @@ class LLMProvider(ABC):
         Yield response chunks from the LLM.
         """
         pass
+
+    async def close(self):
+        """
+        Release network clients held by the provider.
+        """
+        pass
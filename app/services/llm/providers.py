@@ -5,6 +5,7 @@ import google.generativeai as genai
 from openai import AsyncOpenAI
 from app.core.config import settings
 from app.services.llm.base import LLMProvider
+from app.core.http import ollama_base_url
 
 logger = logging.getLogger(__name__)
 
@@ -61,13 +62,20 @@ class GroqLLM(LLMProvider):
                 temperature=0.7,
                 stream=True
             )
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            try:
+                async for chunk in stream:
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Closes the HTTP response so the provider stops generating on cancellation
+                await stream.close()
         except Exception as e:
             logger.error(f"GroqLLM Stream Error: {e}")
             raise e
 
+    async def close(self):
+        await self.client.close()
+
 class GeminiLLM(LLMProvider):
     def __init__(self):
         genai.configure(api_key=settings.GEMINI_API_KEY)
@@ -131,14 +139,22 @@ class OpenAILLM(LLMProvider):
             messages=[{"role": "user", "content": full_prompt}],
             stream=True
         )
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        try:
+            async for chunk in stream:
+                if chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+    async def close(self):
+        await self.client.close()
 
 class LocalLLM(LLMProvider):
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
         self.base_url = settings.LOCAL_LLM_URL
-        self.client = httpx.AsyncClient(base_url=self.base_url)
+        # Use the application's pooled Ollama client when given, so connections are kept alive
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(base_url=ollama_base_url())
 
     async def generate(self, prompt: str, context: Optional[str] = None, **kwargs) -> str:
         if context:
@@ -165,27 +181,22 @@ class LocalLLM(LLMProvider):
         # Updating strictly to use /api/chat requires changing how we call it.
         # Ollama native API: POST /api/chat {"model": "...", "messages": [...]}
         
-        # We need to strip /v1 from base_url if it's there
-        base = self.base_url.replace("/v1", "")
-        if base.endswith("/"):
-            base = base[:-1]
-            
+        # The client's base URL already has /v1 stripped
         try:
-            async with httpx.AsyncClient(base_url=base, timeout=120.0) as client:
-                response = await client.post("/api/chat", json={
-                    "model": settings.LOCAL_LLM_MODEL, 
-                    "messages": [{"role": "user", "content": full_prompt}],
-                    "stream": False,
-                    "options": {"temperature": 0.7}
-                })
-                if response.status_code == 404:
-                    # Fallback to 'llama3.2:1b' if 'llama3.2' not found? 
-                    # Or just raise error. The user said they installed it.
-                    # Let's try to pull if missing? No, that's too much magic.
-                    raise Exception(f"Model '{settings.LOCAL_LLM_MODEL}' not found on Ollama server. Please run `ollama pull {settings.LOCAL_LLM_MODEL}`")
-                response.raise_for_status()
-                logger.info("LocalLLM Response received")
-                return response.json()["message"]["content"]
+            response = await self.client.post("/api/chat", json={
+                "model": settings.LOCAL_LLM_MODEL, 
+                "messages": [{"role": "user", "content": full_prompt}],
+                "stream": False,
+                "options": {"temperature": 0.7}
+            }, timeout=120.0)
+            if response.status_code == 404:
+                # Fallback to 'llama3.2:1b' if 'llama3.2' not found? 
+                # Or just raise error. The user said they installed it.
+                # Let's try to pull if missing? No, that's too much magic.
+                raise Exception(f"Model '{settings.LOCAL_LLM_MODEL}' not found on Ollama server. Please run `ollama pull {settings.LOCAL_LLM_MODEL}`")
+            response.raise_for_status()
+            logger.info("LocalLLM Response received")
+            return response.json()["message"]["content"]
         except Exception as e:
             logger.error(f"LocalLLM Error: {e}")
             raise e
@@ -196,37 +207,37 @@ class LocalLLM(LLMProvider):
         else:
             full_prompt = f"{STRICT_SYSTEM_PROMPT}\n\nContext: None\n\nQuestion: {prompt}\n\nNote: Please provide a short, concise answer."
             
-        base = self.base_url.replace("/v1", "")
-        if base.endswith("/"):
-            base = base[:-1]
-            
-        async with httpx.AsyncClient(base_url=base, timeout=60.0) as client:
-            try:
-                # Use custom model if provided, else from settings
-                model = kwargs.get('model') or settings.LOCAL_LLM_MODEL
-                
-                async with client.stream("POST", "/api/chat", json={
-                    "model": model,
-                    "messages": [{"role": "user", "content": full_prompt}],
-                    "stream": True,
-                    "options": {"temperature": 0.7}
-                }) as response:
-                    if response.status_code != 200:
-                        error_text = await response.aread()
-                        raise Exception(f"Ollama API Error: {response.status_code} - {error_text.decode()}")
-                        
-                    async for chunk in response.aiter_lines():
-                        if chunk:
-                            import json
-                            try:
-                                data = json.loads(chunk)
-                                content = data.get("message", {}).get("content", "")
-                                if content:
-                                    yield content
-                                if data.get("done", False):
-                                    break
-                            except Exception as parse_err:
-                                print(f"JSON Parse Error: {parse_err}, Chunk: {chunk}")
-                                pass
-            except Exception as e:
-                raise e
+        try:
+            # Use custom model if provided, else from settings
+            model = kwargs.get('model') or settings.LOCAL_LLM_MODEL
+
+            async with self.client.stream("POST", "/api/chat", json={
+                "model": model,
+                "messages": [{"role": "user", "content": full_prompt}],
+                "stream": True,
+                "options": {"temperature": 0.7}
+            }, timeout=60.0) as response:
+                if response.status_code != 200:
+                    error_text = await response.aread()
+                    raise Exception(f"Ollama API Error: {response.status_code} - {error_text.decode()}")
+                    
+                async for chunk in response.aiter_lines():
+                    if chunk:
+                        import json
+                        try:
+                            data = json.loads(chunk)
+                            content = data.get("message", {}).get("content", "")
+                            if content:
+                                yield content
+                            if data.get("done", False):
+                                break
+                        except Exception as parse_err:
+                            print(f"JSON Parse Error: {parse_err}, Chunk: {chunk}")
+                            pass
+        except Exception as e:
+            raise e
+
+    async def close(self):
+        # A shared client is closed by its pool
+        if self._owns_client:
+            await self.client.aclose()
@@ -1,77 +1,167 @@
-from typing import List, Dict
-from collections import defaultdict
+import time
+import asyncio
+from typing import List, Dict, Tuple
+from app.services.memory_store import ConversationStore
+from app.core.config import settings
+from app.core.logging import logger
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text; good enough for budgeting
+    return (len(text) + 3) // 4
+
+def format_turns(turns: List[Dict]) -> str:
+    return "\n".join(
+        f"{'User' if turn['role'] == 'user' else 'Assistant'}: {turn['content']}"
+        for turn in turns
+    )
 
 class MemoryManager:
     """
-    Simple in-memory conversation history manager.
-    Stores last N turns for each session.
+    Conversation history manager.
+    Stores last N turns for each session in a SQLite-backed ConversationStore,
+    and folds turns that no longer fit the prompt budget into a rolling summary.
     """
-    def __init__(self, history_limit: int = 10, persistence_file: str = "data/chat_history.json"):
-        self.history: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+    def __init__(
+        self,
+        history_limit: int = 10,
+        db_path: str = "data/chat_history.sqlite",
+        legacy_file: str = "data/chat_history.json",
+        llm_router=None,
+        token_budget: int = settings.HISTORY_TOKEN_BUDGET,
+        summary_tokens: int = settings.HISTORY_SUMMARY_TOKENS
+    ):
         self.limit = history_limit
-        self.persistence_file = persistence_file
-        self.load_history()
-
-    def load_history(self):
-        import json
-        import os
-        if os.path.exists(self.persistence_file):
-            try:
-                with open(self.persistence_file, "r") as f:
-                    data = json.load(f)
-                    # Convert to defaultdict
-                    self.history = defaultdict(list, data)
-            except Exception as e:
-                print(f"Error loading history: {e}")
-
-    def save_history(self):
-        import json
-        import os
-        
-        # ensure directory exists
-        os.makedirs(os.path.dirname(self.persistence_file), exist_ok=True)
-        
-        try:
-            with open(self.persistence_file, "w") as f:
-                json.dump(self.history, f)
-        except Exception as e:
-            print(f"Error saving history: {e}")
+        self.llm_router = llm_router
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self._summarizing = set()
+        self.store = ConversationStore(db_path, max_turns=history_limit * 2)
+        # Histories written by older versions are imported once
+        self.store.migrate_json(legacy_file)
 
     def add_turn(self, session_id: str, user_query: str, ai_response: str):
         if not session_id:
             return
-            
-        self.history[session_id].append({"role": "user", "content": user_query})
-        self.history[session_id].append({"role": "assistant", "content": ai_response})
-        
-        # Trim history
-        if len(self.history[session_id]) > self.limit * 2:
-            self.history[session_id] = self.history[session_id][-(self.limit * 2):]
-            
-        self.save_history()
+
+        now = time.time()
+        self.store.append(session_id, [
+            {"role": "user", "content": user_query, "created_at": now},
+            {"role": "assistant", "content": ai_response, "created_at": now + 1e-6},
+        ])
 
     def get_history(self, session_id: str) -> str:
-        if not session_id or session_id not in self.history:
+        if not session_id:
             return ""
-            
-        formatted_history = []
-        for turn in self.history[session_id]:
-            role = "User" if turn["role"] == "user" else "Assistant"
-            formatted_history.append(f"{role}: {turn['content']}")
-            
-        return "\n".join(formatted_history)
+        return format_turns(self.store.get_turns(session_id))
+
+    def _split_turns(self, turns: List[Dict], budget: int) -> Tuple[List[Dict], List[Dict]]:
+        """Splits turns into (older, newest) where the newest fit in `budget` tokens."""
+        used = 0
+        start = len(turns)
+        while start > 0:
+            cost = estimate_tokens(format_turns(turns[start - 1:start]))
+            if used + cost > budget:
+                break
+            used += cost
+            start -= 1
+        return turns[:start], turns[start:]
+
+    def build_history(self, session_id: str) -> Tuple[str, Dict]:
+        """
+        Returns the history to put in the prompt and token metrics.
+        The rolling summary comes first, followed by the newest unsummarized
+        turns that fit in what is left of the token budget.
+        """
+        metrics = {"history_tokens_raw": 0, "history_tokens": 0, "history_summarized": False}
+        if not session_id:
+            return "", metrics
+
+        turns = self.store.get_turns(session_id)
+        if not turns:
+            return "", metrics
+        metrics["history_tokens_raw"] = estimate_tokens(format_turns(turns))
+
+        summary, covered_until = self.store.get_summary(session_id)
+        recent = [turn for turn in turns if turn["created_at"] > covered_until]
+        budget = self.token_budget - estimate_tokens(summary)
+        _, verbatim = self._split_turns(recent, budget)
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+            metrics["history_summarized"] = True
+        if verbatim:
+            parts.append(format_turns(verbatim))
+        history = "\n".join(parts)
+        metrics["history_tokens"] = estimate_tokens(history)
+        return history, metrics
+
+    async def summarize(self, session_id: str):
+        """
+        Folds older turns into the session's rolling summary once the
+        unsummarized turns outgrow the budget. Meant to run in the background
+        after a turn; at most one summary per session is generated at a time.
+        """
+        if self.llm_router is None or not session_id or session_id in self._summarizing:
+            return
+
+        self._summarizing.add(session_id)
+        try:
+            summary, covered_until, recent = await asyncio.to_thread(self._unsummarized, session_id)
+            verbatim_budget = self.token_budget - self.summary_tokens
+            if estimate_tokens(format_turns(recent)) <= verbatim_budget:
+                return
+
+            # Keep half the verbatim budget free so we don't summarize on every turn
+            older, _ = self._split_turns(recent, verbatim_budget // 2)
+            if not older:
+                return
+
+            prompt = (
+                f"Update the running summary of a conversation with the new turns below. "
+                f"Keep facts, names, decisions and open questions the user may refer back to. "
+                f"Answer with the summary only, in at most {self.summary_tokens * 3 // 4} words.\n\n"
+                f"Current summary: {summary or 'None'}\n\n"
+                f"New turns:\n{format_turns(older)}"
+            )
+            llm = self.llm_router.get_provider()
+            new_summary = (await llm.generate(prompt)).strip()
+
+            # The session may have been cleared, or summarized by another worker, meanwhile
+            _, current_covered_until, current = await asyncio.to_thread(self._unsummarized, session_id)
+            if current_covered_until != covered_until or not any(
+                turn["created_at"] == older[-1]["created_at"] for turn in current
+            ):
+                logger.info(f"Session {session_id} changed during summarization, discarding the summary")
+                return
+            self.store.set_summary(session_id, new_summary, older[-1]["created_at"])
+            logger.info(f"Summarized {len(older)} turns of session {session_id}")
+        except Exception as e:
+            logger.error(f"History summarization failed for session {session_id}: {e}")
+        finally:
+            self._summarizing.discard(session_id)
+
+    def _unsummarized(self, session_id: str) -> Tuple[str, float, List[Dict]]:
+        """The session's summary, what it covers, and the turns after that."""
+        summary, covered_until = self.store.get_summary(session_id)
+        recent = [turn for turn in self.store.get_turns(session_id) if turn["created_at"] > covered_until]
+        return summary, covered_until, recent
 
     def get_raw_history(self, session_id: str) -> List[Dict[str, str]]:
-        return self.history.get(session_id, [])
+        # created_at is internal bookkeeping for summaries
+        return [{"role": turn["role"], "content": turn["content"]} for turn in self.store.get_turns(session_id)]
 
     def get_all_sessions(self) -> List[str]:
-        return list(self.history.keys())
+        return self.store.get_session_ids()
+
+    def get_frequent_questions(self, limit: int = 100) -> List[str]:
+        return self.store.get_frequent_questions(limit)
 
     def clear_history(self, session_id: str):
-        if session_id in self.history:
-            del self.history[session_id]
-            self.save_history()
+        self.store.clear(session_id)
 
     def clear_all_history(self):
-        self.history.clear()
-        self.save_history()
+        self.store.clear()
+
+    def close(self):
+        self.store.close()
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.core.logging import logger
+
+# Pending operations: ("append", session_id, turns), ("summary", session_id, text, covered_until)
+# or ("clear", session_id or None for all)
+Operation = Tuple
+
+class ConversationStore:
+    """
+    Per-session conversation store backed by SQLite in WAL mode.
+
+    Turns are appended as rows, so a message costs one insert instead of a
+    rewrite of every session. Writes are queued and committed off the event
+    loop by a background thread, several at a time in one transaction.
+    Reads see queued writes immediately by replaying them over the committed
+    rows. WAL plus a busy timeout lets several worker processes share the file.
+    """
+    def __init__(self, path: str, max_turns: int, flush_interval: float = 0.05):
+        self.path = path
+        self.max_turns = max_turns
+        self.flush_interval = flush_interval
+        self._pending: List[Operation] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._writer_conn = self._connect()
+        self._writer_conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._writer_conn.execute("CREATE INDEX IF NOT EXISTS idx_turns_session ON turns(session_id, id)")
+        # Rolling summary of the turns created up to `covered_until`
+        self._writer_conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, covered_until REAL NOT NULL)"
+        )
+        self._writer_conn.commit()
+        self._reader_conn = self._connect()
+
+        self._thread = threading.Thread(target=self._run, name="conversation-store", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def migrate_json(self, json_path: str):
+        """One-off import of the legacy whole-file JSON history, if the store is still empty."""
+        if not os.path.exists(json_path):
+            return
+        if self._writer_conn.execute("SELECT 1 FROM turns LIMIT 1").fetchone():
+            return
+        try:
+            with open(json_path, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading legacy history from {json_path}: {e}")
+            return
+
+        # Distinct, ordered timestamps so summaries can tell migrated turns apart
+        now = time.time()
+        rows = [
+            (session_id, turn["role"], turn["content"], now + i * 1e-6)
+            for session_id, turns in data.items()
+            for i, turn in enumerate(turns[-self.max_turns:])
+        ]
+        with self._writer_conn:
+            self._writer_conn.executemany(
+                "INSERT INTO turns (session_id, role, content, created_at) VALUES (?, ?, ?, ?)", rows
+            )
+        os.replace(json_path, json_path + ".migrated")
+        logger.info(f"Migrated {len(data)} sessions from {json_path} to {self.path}")
+
+    # --- Writes (queued) ---
+
+    def append(self, session_id: str, turns: List[Dict[str, str]]):
+        self._enqueue(("append", session_id, turns))
+
+    def set_summary(self, session_id: str, summary: str, covered_until: float):
+        self._enqueue(("summary", session_id, summary, covered_until))
+
+    def clear(self, session_id: Optional[str] = None):
+        self._enqueue(("clear", session_id))
+
+    def _enqueue(self, op: Operation):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Conversation store is closed")
+            self._pending.append(op)
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            closed = self._closed
+            if not closed:
+                # Give concurrent turns a moment to join the same transaction
+                time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            # close() may have run during the sleep; its wakeup was just cleared
+            closed = self._closed
+            try:
+                self._flush()
+            except Exception as e:
+                logger.error(f"Conversation store write failed: {e}")
+                if not closed:
+                    time.sleep(1.0)
+                    self._wakeup.set()
+            if closed:
+                return
+
+    def _flush(self):
+        with self._lock:
+            batch = list(self._pending)
+        if not batch:
+            return
+
+        conn = self._writer_conn
+        touched = set()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for op in batch:
+                if op[0] == "append":
+                    _, session_id, turns = op
+                    conn.executemany(
+                        "INSERT INTO turns (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                        [(session_id, turn["role"], turn["content"], turn["created_at"]) for turn in turns]
+                    )
+                    touched.add(session_id)
+                elif op[0] == "summary":
+                    conn.execute(
+                        "INSERT OR REPLACE INTO summaries (session_id, summary, covered_until) VALUES (?, ?, ?)",
+                        op[1:]
+                    )
+                elif op[1] is None:
+                    conn.execute("DELETE FROM turns")
+                    conn.execute("DELETE FROM summaries")
+                    touched.clear()
+                else:
+                    conn.execute("DELETE FROM turns WHERE session_id = ?", (op[1],))
+                    conn.execute("DELETE FROM summaries WHERE session_id = ?", (op[1],))
+                    touched.discard(op[1])
+
+            # Keep only the most recent turns of the sessions that grew
+            for session_id in touched:
+                conn.execute(
+                    "DELETE FROM turns WHERE session_id = ? AND id <= ("
+                    "SELECT id FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (session_id, session_id, self.max_turns)
+                )
+        except Exception:
+            conn.rollback()
+            raise
+
+        # Commit and dequeue together so readers never see a batch twice
+        with self._lock:
+            conn.commit()
+            del self._pending[:len(batch)]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=10)
+        self._writer_conn.close()
+        self._reader_conn.close()
+
+    # --- Reads ---
+
+    def get_turns(self, session_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            rows = self._reader_conn.execute(
+                "SELECT role, content, created_at FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, self.max_turns)
+            ).fetchall()
+            pending = list(self._pending)
+
+        turns = [
+            {"role": role, "content": content, "created_at": created_at}
+            for role, content, created_at in reversed(rows)
+        ]
+        for op in pending:
+            if op[0] == "append":
+                if op[1] == session_id:
+                    turns.extend(op[2])
+            elif op[0] == "clear" and op[1] in (None, session_id):
+                turns = []
+        return turns[-self.max_turns:]
+
+    def get_summary(self, session_id: str) -> Tuple[str, float]:
+        """Returns (summary, covered_until); ("", 0.0) when the session has no summary yet."""
+        with self._lock:
+            row = self._reader_conn.execute(
+                "SELECT summary, covered_until FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            pending = list(self._pending)
+
+        summary = tuple(row) if row else ("", 0.0)
+        for op in pending:
+            if op[0] == "summary":
+                if op[1] == session_id:
+                    summary = (op[2], op[3])
+            elif op[0] == "clear" and op[1] in (None, session_id):
+                summary = ("", 0.0)
+        return summary
+
+    def get_frequent_questions(self, limit: int) -> List[str]:
+        """Most often asked user messages across all sessions, compared case-insensitively."""
+        with self._lock:
+            rows = self._reader_conn.execute(
+                "SELECT MIN(content) FROM turns WHERE role = 'user' "
+                "GROUP BY lower(trim(content)) ORDER BY COUNT(*) DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_session_ids(self) -> List[str]:
+        with self._lock:
+            rows = self._reader_conn.execute(
+                "SELECT session_id FROM turns GROUP BY session_id ORDER BY MIN(id)"
+            ).fetchall()
+            pending = list(self._pending)
+
+        # Dict keys keep first-seen order
+        sessions = dict.fromkeys(row[0] for row in rows)
+        for op in pending:
+            if op[0] == "append":
+                sessions.setdefault(op[1])
+            elif op[0] == "summary":
+                continue
+            elif op[1] is None:
+                sessions.clear()
+            else:
+                sessions.pop(op[1], None)
+        return list(sessions)
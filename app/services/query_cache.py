@@ -0,0 +1,123 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import faiss
+import numpy as np
+from app.models.schemas import QueryResponse
+from app.core.logging import logger
+
+class SemanticQueryCache:
+    """
+    Response cache for /query keyed by query meaning rather than exact text.
+
+    Past queries are embedded and kept in a small inner-product FAISS index per
+    (mode, provider) partition. A new query whose normalized embedding is at
+    least `threshold` similar to a cached one gets the stored response back.
+    Entries expire after `ttl` seconds, the least recently used are evicted
+    above `max_entries`, and everything is dropped when the document index changes.
+    """
+    def __init__(self, threshold: float = 0.95, ttl: float = 3600, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.index_version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._indexes: Dict[Tuple[str, str], faiss.IndexIDMap2] = {}
+        # id -> (partition, response, stored_at), in LRU order
+        self._entries: "OrderedDict[int, Tuple[Tuple[str, str], QueryResponse, float]]" = OrderedDict()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(array)
+        return array
+
+    def set_index_version(self, version: str):
+        """Drops all cached responses; they were grounded on a different document set."""
+        with self._lock:
+            if version == self.index_version:
+                return
+            self.index_version = version
+            self._indexes.clear()
+            self._entries.clear()
+            self.invalidations += 1
+        logger.info(f"Query cache reset for index version {version}")
+
+    def lookup(self, vector: List[float], mode: str, provider: str) -> Optional[Tuple[QueryResponse, float]]:
+        """Returns (response, similarity) for the closest live entry above the threshold."""
+        partition = (mode, provider)
+        query = self._normalize(vector)
+        with self._lock:
+            index = self._indexes.get(partition)
+            if index is None or index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            # Look past the nearest neighbour in case it has expired
+            scores, ids = index.search(query, min(4, index.ntotal))
+            now = time.time()
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    break
+                entry = self._entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                if now - entry[2] > self.ttl:
+                    self._remove(int(entry_id))
+                    continue
+                self._entries.move_to_end(int(entry_id))
+                self.hits += 1
+                return entry[1], float(score)
+
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        vector: List[float],
+        mode: str,
+        provider: str,
+        response: QueryResponse,
+        index_version: Optional[str] = None
+    ):
+        """
+        Caches `response`. `index_version` is the version the answer was retrieved
+        from; if the index changed since, the response is stale and not stored.
+        """
+        partition = (mode, provider)
+        query = self._normalize(vector)
+        with self._lock:
+            if index_version is not None and index_version != self.index_version:
+                logger.info("Index changed while the query ran, not caching its response")
+                return
+            index = self._indexes.get(partition)
+            if index is None:
+                index = faiss.IndexIDMap2(faiss.IndexFlatIP(query.shape[1]))
+                self._indexes[partition] = index
+
+            entry_id = self._next_id
+            self._next_id += 1
+            index.add_with_ids(query, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (partition, response, time.time())
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int):
+        partition, _, _ = self._entries.pop(entry_id)
+        self._indexes[partition].remove_ids(np.array([entry_id], dtype=np.int64))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
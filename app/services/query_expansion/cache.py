@@ -0,0 +1,94 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional
+from app.core.logging import logger
+
+def normalize_query(query: str) -> str:
+    # Case, spacing and trailing punctuation don't change what the user is asking
+    return re.sub(r"[\s?!.]+$", "", " ".join(query.lower().split()))
+
+class ExpansionCache:
+    """
+    Disk-backed cache of LLM query expansions.
+    Entries are keyed by (model key, normalized query), expire after `ttl`
+    seconds and are evicted least recently used above `max_entries`.
+    """
+    def __init__(self, path: str, max_entries: int = 10_000, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS expansions ("
+            "key TEXT PRIMARY KEY, queries TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_expansions_last_access ON expansions(last_access)")
+        self.conn.commit()
+        self._count = self.conn.execute("SELECT COUNT(*) FROM expansions").fetchone()[0]
+        logger.info(f"Expansion cache opened at {path} with {self._count} entries")
+
+    @staticmethod
+    def make_key(model_key: str, query: str) -> str:
+        return hashlib.sha256(f"{model_key}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT queries, created_at FROM expansions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self.conn.execute("DELETE FROM expansions WHERE key = ?", (key,))
+                    self._count -= 1
+                    self.conn.commit()
+                self.misses += 1
+                return None
+
+            self.conn.execute("UPDATE expansions SET last_access = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, queries: List[str]):
+        now = time.time()
+        with self._lock:
+            existed = self.conn.execute("SELECT 1 FROM expansions WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO expansions (key, queries, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(queries), now, now)
+            )
+            if not existed:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Expired entries go first, then the least recently used down to 90% of the cap
+        self.conn.execute("DELETE FROM expansions WHERE created_at < ?", (time.time() - self.ttl,))
+        self._count = self.conn.execute("SELECT COUNT(*) FROM expansions").fetchone()[0]
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM expansions WHERE key IN "
+                "(SELECT key FROM expansions ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            self._count = self.conn.execute("SELECT COUNT(*) FROM expansions").fetchone()[0]
+        logger.info(f"Expansion cache evicted down to {self._count} entries")
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": self._count, "hits": self.hits, "misses": self.misses}
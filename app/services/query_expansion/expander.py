@@ -1,22 +1,75 @@
-from typing import List
+import asyncio
+from typing import Awaitable, Dict, List, Optional
+from langchain_core.documents import Document
 from app.services.router import LLMRouter
+from app.services.query_expansion.cache import ExpansionCache
+from app.services.query_expansion.local import LocalExpander
+from app.services.retriever.hybrid import HybridRetriever
 from app.core.config import settings
 from app.core.logging import logger
 
 class QueryExpander:
-    def __init__(self):
-        self.llm_router = LLMRouter()
+    def __init__(
+        self,
+        llm_router: Optional[LLMRouter] = None,
+        cache: Optional[ExpansionCache] = None,
+        retriever: Optional[HybridRetriever] = None
+    ):
+        # Share the application's router so provider clients are reused
+        self.llm_router = llm_router or LLMRouter()
+        self.cache = cache
+        # The local strategy needs the indexes; without them every expansion uses the LLM
+        self.local = LocalExpander(retriever) if retriever is not None else None
+        # LLM expansions that outlive a cancelled request, still on their way to the cache
+        self._pending = set()
 
-    async def generate_queries(self, original_query: str) -> List[str]:
+    def _cache_key(self, query: str) -> str:
+        # Expansions depend on the model that wrote them and on how many were asked for
+        provider = settings.DEFAULT_LLM_PROVIDER
+        model = settings.LOCAL_LLM_MODEL if provider == "local" else ""
+        return self.cache.make_key(f"{provider}:{model}:{settings.QUERY_EXPANSION_COUNT}", query)
+
+    async def generate_queries(
+        self,
+        original_query: str,
+        strategy: Optional[str] = None,
+        candidates: Optional[Awaitable[List[List[Document]]]] = None
+    ) -> List[str]:
         """
-        Generates multiple search queries based on the original user query.
+        Generates multiple search queries based on the original user query,
+        with the LLM or locally from the indexes (`strategy`, default QUERY_EXPANSION_STRATEGY).
+        `candidates`, the caller's retrieval for the original query, is reused by local expansion.
         """
         if not settings.USE_QUERY_EXPANSION:
             return [original_query]
 
         count = settings.QUERY_EXPANSION_COUNT
+        if (strategy or settings.QUERY_EXPANSION_STRATEGY) == "local" and self.local is not None:
+            try:
+                return await self.local.expand(original_query, count, candidates)
+            except Exception as e:
+                logger.error(f"Local query expansion failed: {e}")
+                return [original_query]
+
+        if self.cache is not None:
+            # SQLite reads and commits, kept off the event loop
+            cached = await asyncio.to_thread(self.cache.get, self._cache_key(original_query))
+            if cached is not None:
+                # Cached expansions exclude the query itself, which may have been spelled differently
+                final_queries = (cached + [original_query])[:count+1]
+                logger.info(f"Query Expansion (cached): Original='{original_query}' -> {final_queries}")
+                return final_queries
+
+        # Shielded: if the caller stops waiting (deadline, first-pass budget, disconnect),
+        # the LLM call still finishes and caches its expansions for the next request
+        task = asyncio.ensure_future(self._expand_with_llm(original_query, count))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return await asyncio.shield(task)
+
+    async def _expand_with_llm(self, original_query: str, count: int) -> List[str]:
         llm = self.llm_router.get_provider()
-        
+
         prompt = (
             f"You are an AI assistant. Generate {count} different search queries "
             f"based on the user question to retrieve relevant documents. "
@@ -25,24 +78,52 @@ class QueryExpander:
         )
 
         try:
-            # We assume the LLM provider has an async ainvoke or similar, 
+            # We assume the LLM provider has an async ainvoke or similar,
             # checking LLM interface compliance might be needed.
             # Wrapper call to customized generate() method
             # Our custom providers return a simple string from generate()
             # We don't pass context here, just the prompting instruction.
             response_content = await llm.generate(prompt)
-            
+
             queries = [q.strip() for q in response_content.split('\n') if q.strip()]
-            
+
             # Ensure original query is included if not present (optional, but good practice)
             # RRF handles redundancy, so more is fine.
             if original_query not in queries:
                 queries.append(original_query)
-                
+
             final_queries = queries[:count+1]
             logger.info(f"Query Expansion: Original='{original_query}' -> Expanded ({len(final_queries)})={final_queries}")
+
+            if self.cache is not None:
+                await asyncio.to_thread(
+                    self.cache.put,
+                    self._cache_key(original_query),
+                    [q for q in final_queries if q != original_query]
+                )
             return final_queries
 
         except Exception as e:
             logger.error(f"Query expansion failed: {e}")
             return [original_query]
+
+    async def prewarm(self, questions: List[str], concurrency: int = 4) -> Dict[str, int]:
+        """
+        Expands `questions` that aren't cached yet, `concurrency` at a time,
+        so their first real request is served from the cache.
+        """
+        if self.cache is None:
+            raise ValueError("Pre-warming needs an expansion cache")
+
+        pending = await asyncio.to_thread(
+            lambda: [q for q in dict.fromkeys(questions) if self.cache.get(self._cache_key(q)) is None]
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def expand(question: str):
+            async with semaphore:
+                await self.generate_queries(question, strategy="llm")
+
+        await asyncio.gather(*(expand(q) for q in pending))
+        logger.info(f"Pre-warmed {len(pending)} of {len(questions)} questions")
+        return {"questions": len(questions), "expanded": len(pending)}
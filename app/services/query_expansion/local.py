@@ -0,0 +1,135 @@
+import asyncio
+import threading
+from collections import Counter
+from typing import Awaitable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from app.services.retriever.hybrid import HybridRetriever
+from app.services.retriever.bm25_index import tokenize
+from app.core.config import settings
+from app.core.logging import logger
+
+class LocalExpander:
+    """
+    Model-free query expansion from the existing indexes.
+
+    Two sources of expansion terms:
+    - pseudo-relevance feedback: terms that weigh most (tf * idf) in the top
+      keyword and vector hits for the query;
+    - embedding neighbours: corpus terms whose embeddings are closest to the
+      query embedding.
+    Each expanded query is the original query plus a few of these terms.
+    """
+    def __init__(
+        self,
+        retriever: HybridRetriever,
+        feedback_docs: int = settings.LOCAL_EXPANSION_FEEDBACK_DOCS,
+        terms_per_query: int = settings.LOCAL_EXPANSION_TERMS_PER_QUERY,
+        vocab_size: int = settings.LOCAL_EXPANSION_VOCAB_SIZE
+    ):
+        self.retriever = retriever
+        self.feedback_docs = feedback_docs
+        self.terms_per_query = terms_per_query
+        self.vocab_size = vocab_size
+        self._lock = threading.Lock()
+        # (retriever index version, terms, normalized term embeddings)
+        self._term_vectors: Optional[Tuple[str, List[str], np.ndarray]] = None
+        # Embeds the vocabulary now and after every ingest, never on a request
+        retriever.add_index_listener(self._build_vocabulary_vectors)
+
+    @staticmethod
+    def _is_candidate(term: str) -> bool:
+        # Whitespace tokens keep punctuation ("mat.", "(see"), which makes poor expansion terms
+        return len(term) > 2 and term.isalnum() and not term.isdigit()
+
+    async def expand(
+        self,
+        query: str,
+        count: int,
+        candidates: Optional[Awaitable[List[List[Document]]]] = None
+    ) -> List[str]:
+        """
+        `candidates` is the caller's retrieval for `query`, if it has one,
+        so the feedback documents aren't searched for twice. It is shielded:
+        cancelling the expansion leaves the caller's retrieval running.
+        """
+        if not self.retriever.is_ready():
+            return [query]
+
+        if candidates is not None:
+            ranked_lists = await asyncio.shield(candidates)
+        else:
+            ranked_lists = await self.retriever.gather_candidates([query])
+        return await self.retriever.executor.run(self._expand, query, count, ranked_lists)
+
+    def _expand(self, query: str, count: int, ranked_lists) -> List[str]:
+        query_terms = set(tokenize(query))
+        feedback = self._feedback_terms(ranked_lists, query_terms)
+        neighbours = self._neighbour_terms(query, query_terms)
+
+        # Alternate between the two sources so each expanded query adds different terms
+        groups = []
+        k = self.terms_per_query
+        for i in range(count):
+            source = feedback if i % 2 == 0 else neighbours
+            offset = (i // 2) * k
+            group = source[offset:offset + k]
+            if group:
+                groups.append(group)
+
+        queries = [f"{query} {' '.join(group)}" for group in groups]
+        queries.append(query)
+        logger.info(f"Local Query Expansion: Original='{query}' -> {queries}")
+        return queries
+
+    def _feedback_terms(self, ranked_lists, query_terms) -> List[str]:
+        index = self.retriever.bm25_index
+        seen = set()
+        weights = Counter()
+        for docs in ranked_lists:
+            for doc in docs[:self.feedback_docs]:
+                if doc.page_content in seen:
+                    continue
+                seen.add(doc.page_content)
+                counts = Counter(tokenize(doc.page_content))
+                length = sum(counts.values()) or 1
+                for term, tf in counts.items():
+                    weights[term] += tf / length
+
+        terms = [t for t in weights if t not in query_terms and self._is_candidate(t) and t in index.vocab]
+        if not terms:
+            return []
+        df = index.df[[index.vocab[t] for t in terms]]
+        scores = np.asarray([weights[t] for t in terms]) * index.idf(df)
+        return [terms[i] for i in np.argsort(-scores)]
+
+    def _build_vocabulary_vectors(self, version: str):
+        """
+        Embeds the most common corpus terms. Runs as an index listener, i.e. when the
+        retriever loads and after content changes (not on keyword index compaction).
+        """
+        index = self.retriever.bm25_index
+        with self._lock:
+            if self._term_vectors is not None and self._term_vectors[0] == version:
+                return
+            terms = [t for t, term_id in list(index.vocab.items()) if index.df[term_id] > 1 and self._is_candidate(t)]
+            terms.sort(key=lambda t: -index.df[index.vocab[t]])
+            terms = terms[:self.vocab_size]
+            if terms:
+                # Mostly embedding-cache hits after the first build
+                vectors = np.asarray(self.retriever.embeddings.embed_documents(terms), dtype=np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+            else:
+                vectors = np.zeros((0, 1), dtype=np.float32)
+            self._term_vectors = (version, terms, vectors)
+            logger.info(f"Embedded {len(terms)} vocabulary terms for local query expansion")
+
+    def _neighbour_terms(self, query: str, query_terms) -> List[str]:
+        term_vectors = self._term_vectors
+        if term_vectors is None or not term_vectors[1]:
+            return []
+        _, terms, vectors = term_vectors
+        query_vector = np.asarray(self.retriever.embeddings.embed_query(query), dtype=np.float32)
+        scores = vectors @ (query_vector / (np.linalg.norm(query_vector) + 1e-12))
+        top = np.argsort(-scores)[:self.terms_per_query * 4 + len(query_terms)]
+        return [terms[i] for i in top if terms[i] not in query_terms]
@@ -0,0 +1,51 @@
+"""
+Pre-computes query expansions so frequent questions are served from the cache.
+
+    python -m app.services.query_expansion.prewarm --from-history 200
+    python -m app.services.query_expansion.prewarm --file questions.txt
+"""
+import asyncio
+import argparse
+from app.core.config import settings
+from app.core.http import HttpClientPool
+from app.services.router import LLMRouter
+from app.services.memory_manager import MemoryManager
+from app.services.query_expansion.cache import ExpansionCache
+from app.services.query_expansion.expander import QueryExpander
+from app.core.logging import logger
+
+async def main(args):
+    questions = []
+    if args.file:
+        with open(args.file, "r") as f:
+            questions.extend(line.strip() for line in f if line.strip())
+    if args.from_history:
+        memory_manager = MemoryManager()
+        questions.extend(memory_manager.get_frequent_questions(args.from_history))
+        memory_manager.close()
+
+    if not questions:
+        logger.warning("No questions to pre-warm. Pass --file and/or --from-history.")
+        return
+
+    http_clients = HttpClientPool()
+    llm_router = LLMRouter(http_clients=http_clients)
+    cache = ExpansionCache(
+        settings.QUERY_EXPANSION_CACHE_PATH,
+        max_entries=settings.QUERY_EXPANSION_CACHE_MAX_ENTRIES,
+        ttl=settings.QUERY_EXPANSION_CACHE_TTL
+    )
+    try:
+        stats = await QueryExpander(llm_router, cache=cache).prewarm(questions, args.concurrency)
+        logger.info(f"Pre-warm finished: {stats}, cache: {cache.stats()}")
+    finally:
+        await llm_router.close()
+        await http_clients.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-compute query expansions into the expansion cache.")
+    parser.add_argument("--file", help="Text file with one question per line")
+    parser.add_argument("--from-history", type=int, default=0, metavar="N",
+                        help="Also expand the N most frequent questions from the chat history")
+    parser.add_argument("--concurrency", type=int, default=4, help="Expansions generated in parallel")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,182 @@
+import math
+from typing import Iterable, Optional
+import numpy as np
+import faiss
+from app.core.config import settings
+from app.core.logging import logger
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "ivfpq", "opq")
+
+# k-means wants ~39 training points per centroid; PQ trains 256 centroids per sub-quantizer
+MIN_POINTS_PER_CENTROID = 39
+PQ_CENTROIDS = 256
+
+def choose_index_type(n_vectors: int) -> str:
+    """VECTOR_INDEX_TYPE, or with "auto" the cheapest type that suits the corpus size."""
+    if settings.VECTOR_INDEX_TYPE != "auto":
+        return settings.VECTOR_INDEX_TYPE
+    if n_vectors <= settings.ANN_FLAT_MAX_VECTORS:
+        return "flat"
+    if n_vectors <= settings.ANN_HNSW_MAX_VECTORS:
+        return "hnsw"
+    # Beyond this, float32 vectors get too big for RAM, so compress them
+    return "ivfpq"
+
+def _nlist(n_vectors: int) -> int:
+    nlist = settings.ANN_IVF_NLIST or int(4 * math.sqrt(n_vectors))
+    return max(1, min(nlist, n_vectors // MIN_POINTS_PER_CENTROID))
+
+def _pq_m(dim: int) -> int:
+    """Sub-quantizers for PQ: ANN_PQ_M, or about 8 dimensions each."""
+    if settings.ANN_PQ_M:
+        return settings.ANN_PQ_M
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+def _trainable_type(index_type: str, n_vectors: int) -> str:
+    # Too few vectors to train the requested type: step down to one that can be trained
+    if index_type in ("ivfpq", "opq") and n_vectors < PQ_CENTROIDS * MIN_POINTS_PER_CENTROID:
+        index_type = "ivf"
+    if index_type == "ivf" and n_vectors < 2 * MIN_POINTS_PER_CENTROID:
+        index_type = "flat"
+    return index_type
+
+def target_index_type(n_vectors: int) -> str:
+    """The index type a corpus of `n_vectors` gets, after stepping down for training."""
+    return _trainable_type(choose_index_type(n_vectors), n_vectors)
+
+def needs_rebuild(index: faiss.Index) -> bool:
+    """
+    Whether the corpus has outgrown `index`: it calls for another index type, or
+    IVF centroids trained on a much smaller corpus (4x fewer lists than it would get now).
+    """
+    if index_type_of(index) != target_index_type(index.ntotal):
+        return True
+    if index_type_of(index) in ("ivf", "ivfpq", "opq"):
+        return faiss.extract_index_ivf(index).nlist * 4 <= _nlist(index.ntotal)
+    return False
+
+def build_index(vectors: np.ndarray, index_type: str) -> faiss.Index:
+    """
+    Creates an empty index of `index_type` for vectors like `vectors`, trained on
+    a sample of them where the type needs training (IVF centroids, PQ codebooks).
+    """
+    n_vectors, dim = vectors.shape
+    requested, index_type = index_type, _trainable_type(index_type, n_vectors)
+    if index_type != requested:
+        logger.warning(f"{n_vectors} vectors are too few to train a {requested} index, using {index_type}")
+
+    if index_type == "flat":
+        description = "Flat"
+    elif index_type == "hnsw":
+        description = f"HNSW{settings.ANN_HNSW_M}"
+    elif index_type == "ivf":
+        description = f"IVF{_nlist(n_vectors)},Flat"
+    elif index_type == "ivfpq":
+        description = f"IVF{_nlist(n_vectors)},PQ{_pq_m(dim)}x8"
+    elif index_type == "opq":
+        m = _pq_m(dim)
+        description = f"OPQ{m},IVF{_nlist(n_vectors)},PQ{m}x8"
+    else:
+        raise ValueError(f"Unknown vector index type '{index_type}', expected one of {INDEX_TYPES}")
+
+    # L2 like LangChain's default FAISS store, so scores and behaviour don't change with the type
+    index = faiss.index_factory(dim, description, faiss.METRIC_L2)
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = settings.ANN_HNSW_EF_CONSTRUCTION
+
+    if not index.is_trained:
+        sample = vectors
+        if n_vectors > settings.ANN_TRAIN_SAMPLE:
+            rows = np.random.default_rng(0).choice(n_vectors, settings.ANN_TRAIN_SAMPLE, replace=False)
+            sample = vectors[rows]
+        logger.info(f"Training {description} index on {len(sample)} of {n_vectors} vectors")
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+
+    apply_search_defaults(index)
+    logger.info(f"Built {description} vector index")
+    return index
+
+def index_type_of(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexPreTransform):
+        return "opq"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+def delete_strategy(index: faiss.Index) -> str:
+    """
+    How vectors are deleted from `index`:
+    - "renumber": Flat, through LangChain's FAISS.delete, which shifts later ids down;
+    - "remove": IVF types drop the vectors with remove_ids and keep every other id;
+    - "tombstone": HNSW can't remove vectors, so searches skip them until a rebuild.
+    """
+    index_type = index_type_of(index)
+    if index_type == "flat":
+        return "renumber"
+    if index_type == "hnsw":
+        return "tombstone"
+    return "remove"
+
+def copy_index(index: faiss.Index) -> faiss.Index:
+    """A deep copy of `index`, search settings included, to edit while the original is searched."""
+    return faiss.clone_index(index)
+
+def exclude_selector(ids: Iterable[int]) -> Optional[faiss.IDSelector]:
+    """A search-time filter that skips `ids`, or None if there are none."""
+    ids = np.fromiter(ids, dtype=np.int64)
+    if not len(ids):
+        return None
+    return faiss.IDSelectorNot(faiss.IDSelectorBatch(ids))
+
+def apply_search_defaults(index: faiss.Index):
+    """Default-mode search settings, used by searches that don't pass parameters (e.g. filtered ones)."""
+    index_type = index_type_of(index)
+    if index_type == "hnsw":
+        index.hnsw.efSearch = settings.ANN_EF_SEARCH
+    elif index_type in ("ivf", "ivfpq", "opq"):
+        faiss.extract_index_ivf(index).nprobe = settings.ANN_NPROBE
+
+def search_params(
+    index: faiss.Index,
+    mode: Optional[str] = None,
+    exclude: Optional[faiss.IDSelector] = None
+) -> Optional[faiss.SearchParameters]:
+    """
+    Per-call search parameters for retrieval `mode`; fast mode searches fewer
+    lists / graph nodes. Per-call so concurrent searches don't race on index state.
+    `exclude` (see exclude_selector) filters out deleted vectors.
+    """
+    fast = mode == "fast"
+    index_type = index_type_of(index)
+    if index_type == "hnsw":
+        return faiss.SearchParametersHNSW(
+            efSearch=settings.ANN_EF_SEARCH_FAST if fast else settings.ANN_EF_SEARCH, sel=exclude
+        )
+    if index_type in ("ivf", "ivfpq", "opq"):
+        params = faiss.SearchParametersIVF(nprobe=settings.ANN_NPROBE_FAST if fast else settings.ANN_NPROBE, sel=exclude)
+        if index_type == "opq":
+            return faiss.SearchParametersPreTransform(index_params=params)
+        return params
+    if exclude is not None:
+        return faiss.SearchParameters(sel=exclude)
+    return None
+
+def reconstruct_vectors(index: faiss.Index, ids: Iterable[int]) -> Optional[np.ndarray]:
+    """
+    The stored vectors with FAISS `ids`, or None if the index only keeps lossy PQ codes
+    (those are re-embedded rather than compounding the quantization error).
+    """
+    index_type = index_type_of(index)
+    if index_type in ("ivfpq", "opq"):
+        return None
+    if index_type == "ivf":
+        # Looked up by id, since ids have gaps once vectors were removed
+        faiss.extract_index_ivf(index).set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index.reconstruct_batch(np.fromiter(ids, dtype=np.int64))
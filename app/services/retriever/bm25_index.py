@@ -0,0 +1,240 @@
+import os
+import json
+import shutil
+import threading
+from collections import Counter
+from typing import Dict, List
+import numpy as np
+from app.core.logging import logger
+
+# Saved with the index; an index tokenized differently is rebuilt on load
+TOKENIZER = "whitespace"
+
+def tokenize(text: str) -> List[str]:
+    # LangChain's BM25Retriever default (whitespace split, case kept), so rankings match rank_bm25
+    return text.split()
+
+class BM25Index:
+    """
+    Native, serializable BM25 index.
+
+    The compacted segment is stored as two CSR layouts over the same postings:
+    term-major (term -> rows, tf) for scoring, see SparseRetriever, and
+    doc-major (row -> terms, tf) for deletes and compaction. Both load with
+    mmap. Documents added after the last compaction live in a small in-memory
+    delta segment; deleted rows are tombstoned until the next compaction.
+    """
+    ARRAYS = ("term_indptr", "post_rows", "post_tfs", "doc_indptr", "doc_terms", "doc_tfs", "doc_len", "df")
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.vocab: Dict[str, int] = {}
+        self.doc_ids: List[str] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.deleted = set()
+        self.total_len = 0.0
+        # Bumped on every mutation so derived structures know when to rebuild
+        self.version = 0
+        self._lock = threading.RLock()
+
+        # Compacted segment
+        self.term_indptr = np.zeros(1, dtype=np.int64)
+        self.post_rows = np.zeros(0, dtype=np.int32)
+        self.post_tfs = np.zeros(0, dtype=np.float32)
+        self.doc_indptr = np.zeros(1, dtype=np.int64)
+        self.doc_terms = np.zeros(0, dtype=np.int32)
+        self.doc_tfs = np.zeros(0, dtype=np.float32)
+
+        # Mutable statistics, covering both segments
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.df = np.zeros(0, dtype=np.int32)
+
+        # Delta segment: row -> {term id: tf}
+        self._delta_docs: Dict[int, Dict[int, float]] = {}
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_ids) - len(self.deleted)
+
+    @property
+    def n_base_rows(self) -> int:
+        return len(self.doc_indptr) - 1
+
+    def add_documents(self, ids: List[str], texts: List[str]):
+        with self._lock:
+            self.delete_documents([doc_id for doc_id in ids if doc_id in self.id_to_row])
+
+            lengths = []
+            for doc_id, text in zip(ids, texts):
+                counts = Counter(tokenize(text))
+                row = len(self.doc_ids)
+                self.doc_ids.append(doc_id)
+                self.id_to_row[doc_id] = row
+
+                term_tfs = {}
+                for term, tf in counts.items():
+                    term_id = self.vocab.setdefault(term, len(self.vocab))
+                    term_tfs[term_id] = float(tf)
+                self._delta_docs[row] = term_tfs
+
+                length = float(sum(counts.values()))
+                lengths.append(length)
+                self.total_len += length
+
+            self.doc_len = np.concatenate([self.doc_len, np.asarray(lengths, dtype=np.float32)])
+            if len(self.vocab) > len(self.df):
+                self.df = np.concatenate([self.df, np.zeros(len(self.vocab) - len(self.df), dtype=np.int32)])
+            for row in range(len(self.doc_ids) - len(lengths), len(self.doc_ids)):
+                for term_id in self._delta_docs[row]:
+                    self.df[term_id] += 1
+            self.version += 1
+
+    def delete_documents(self, ids: List[str]):
+        with self._lock:
+            for doc_id in ids:
+                row = self.id_to_row.pop(doc_id, None)
+                if row is None:
+                    continue
+                self.deleted.add(row)
+                self.df[self._row_terms(row)] -= 1
+                self.total_len -= float(self.doc_len[row])
+                self.version += 1
+
+    def _row_terms(self, row: int) -> np.ndarray:
+        if row in self._delta_docs:
+            return np.fromiter(self._delta_docs[row].keys(), dtype=np.int32)
+        return np.asarray(self.doc_terms[self.doc_indptr[row]:self.doc_indptr[row + 1]])
+
+    def idf(self, df: np.ndarray) -> np.ndarray:
+        """
+        rank_bm25's BM25Okapi IDF. Terms in more than half the documents would get a
+        negative IDF; like rank_bm25 they get epsilon * the mean IDF of the vocabulary instead.
+        """
+        n = self.n_docs
+        idf = np.log((n - df + 0.5) / (df + 0.5))
+        with self._lock:
+            live_df = self.df[self.df > 0]
+        if not len(live_df):
+            return idf
+        average_idf = float(np.mean(np.log((n - live_df + 0.5) / (live_df + 0.5))))
+        return np.where(idf < 0, self.epsilon * average_idf, idf)
+
+    def has_pending_changes(self) -> bool:
+        return bool(self._delta_docs or self.deleted)
+
+    def compact(self):
+        """Merges the delta segment into the compacted arrays and drops tombstoned rows."""
+        with self._lock:
+            n_base = self.n_base_rows
+            keep = np.ones(len(self.doc_ids), dtype=bool)
+            if self.deleted:
+                keep[list(self.deleted)] = False
+
+            # Doc-major entries of live compacted rows
+            base_rows = np.repeat(np.arange(n_base, dtype=np.int64), np.diff(self.doc_indptr))
+            base_mask = keep[:n_base][base_rows]
+            entry_rows = [base_rows[base_mask]]
+            entry_terms = [np.asarray(self.doc_terms)[base_mask]]
+            entry_tfs = [np.asarray(self.doc_tfs)[base_mask]]
+
+            # Then the live delta rows, in row order
+            for row in range(n_base, len(self.doc_ids)):
+                if keep[row]:
+                    term_tfs = self._delta_docs[row]
+                    entry_rows.append(np.full(len(term_tfs), row, dtype=np.int64))
+                    entry_terms.append(np.fromiter(term_tfs.keys(), dtype=np.int32, count=len(term_tfs)))
+                    entry_tfs.append(np.fromiter(term_tfs.values(), dtype=np.float32, count=len(term_tfs)))
+
+            old_rows = np.concatenate(entry_rows)
+            doc_terms = np.concatenate(entry_terms).astype(np.int32)
+            doc_tfs = np.concatenate(entry_tfs).astype(np.float32)
+
+            # Renumber rows densely
+            new_row = np.cumsum(keep) - 1
+            rows = new_row[old_rows].astype(np.int32)
+            n_rows = int(keep.sum())
+
+            self.doc_indptr = np.zeros(n_rows + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=n_rows), out=self.doc_indptr[1:])
+            self.doc_terms = doc_terms
+            self.doc_tfs = doc_tfs
+
+            # Term-major transpose of the same postings
+            order = np.argsort(doc_terms, kind="stable")
+            self.post_rows = rows[order]
+            self.post_tfs = doc_tfs[order]
+            self.term_indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(doc_terms, minlength=len(self.vocab)), out=self.term_indptr[1:])
+
+            self.doc_len = np.asarray(self.doc_len)[keep]
+            self.doc_ids = [doc_id for doc_id, live in zip(self.doc_ids, keep) if live]
+            self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+            self.deleted = set()
+            self._delta_docs = {}
+            self.version += 1
+
+    def save(self, path: str):
+        with self._lock:
+            self.compact()
+
+            tmp_path = f"{path}.tmp"
+            if os.path.exists(tmp_path):
+                shutil.rmtree(tmp_path)
+            os.makedirs(tmp_path)
+
+            for name in self.ARRAYS:
+                np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(getattr(self, name)))
+
+            terms = [None] * len(self.vocab)
+            for term, term_id in self.vocab.items():
+                terms[term_id] = term
+            with open(os.path.join(tmp_path, "vocab.txt"), "w", encoding="utf-8") as f:
+                f.write("\n".join(terms))
+            with open(os.path.join(tmp_path, "doc_ids.txt"), "w", encoding="utf-8") as f:
+                f.write("\n".join(self.doc_ids))
+            with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+                json.dump({
+                    "k1": self.k1, "b": self.b, "epsilon": self.epsilon,
+                    "total_len": self.total_len, "tokenizer": TOKENIZER
+                }, f)
+
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(tmp_path, path)
+
+    @staticmethod
+    def can_load(path: str) -> bool:
+        """Whether `path` holds an index saved with the current tokenizer."""
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path) as f:
+            # Indexes from before the tokenizer was recorded used lowercased \w+ tokens
+            return json.load(f).get("tokenizer") == TOKENIZER
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        index = cls(k1=meta["k1"], b=meta["b"], epsilon=meta.get("epsilon", 0.25))
+        index.total_len = meta["total_len"]
+
+        for name in cls.ARRAYS:
+            array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            # Statistics are updated in place, the postings are read-only until compaction
+            setattr(index, name, np.array(array) if name in ("doc_len", "df") else array)
+
+        with open(os.path.join(path, "vocab.txt"), encoding="utf-8") as f:
+            content = f.read()
+            terms = content.split("\n") if content else []
+        index.vocab = {term: term_id for term_id, term in enumerate(terms)}
+
+        with open(os.path.join(path, "doc_ids.txt"), encoding="utf-8") as f:
+            content = f.read()
+            index.doc_ids = content.split("\n") if content else []
+        index.id_to_row = {doc_id: row for row, doc_id in enumerate(index.doc_ids)}
+
+        logger.info(f"Loaded BM25 index with {index.n_docs} documents and {len(index.vocab)} terms")
+        return index
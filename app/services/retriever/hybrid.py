@@ -1,16 +1,28 @@
 import os
-import pickle
-from typing import List, Dict, Optional, Any
+import uuid
+import shutil
+import asyncio
+import numpy as np
+from typing import List, Dict, Optional, Any, Set, Tuple, Callable
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.retrievers import BM25Retriever
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from app.services.retriever.base import BaseRetriever
 from app.services.retriever.ensemble import EnsembleRetriever
 from app.services.retriever.reranker import ReRanker
+from app.services.retriever import ann
+from app.services.retriever.bm25_index import BM25Index
+from app.services.retriever.sparse import SparseRetriever
+from app.services.retriever.score_cache import RerankScoreCache
+from app.services.embeddings.cache import EmbeddingCache, CachedEmbeddings
+from app.services.inference import load_embeddings, model_key
+from app.core.executor import BoundedExecutor
+from app.core.batching import MicroBatcher
 from app.core.logging import logger
 
 INDEX_DIR = "data/index"
+BM25_DIR = os.path.join(INDEX_DIR, "bm25")
 
 from app.core.config import settings
 
@@ -20,7 +32,12 @@ class HybridRetriever(BaseRetriever):
         use_rrf: bool = settings.USE_RRF,
         use_rerank: bool = settings.USE_RERANK,
         rrf_k: int = settings.RRF_K,
-        top_k_retrieval: int = settings.TOP_K_RETRIEVAL
+        top_k_retrieval: int = settings.TOP_K_RETRIEVAL,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        executor: Optional[BoundedExecutor] = None,
+        rerank_cache: Optional[RerankScoreCache] = None,
+        embeddings: Optional[Embeddings] = None,
+        rerank_scorer: Optional[MicroBatcher] = None
     ):
         """
         Args:
@@ -28,11 +45,32 @@ class HybridRetriever(BaseRetriever):
             use_rerank: Whether to use Cross-Encoder Re-ranking.
             rrf_k: RRF constant 'k'.
             top_k_retrieval: Number of documents to retrieve from each source before fusion/reranking.
+            embedding_cache: Optional disk cache consulted before the embedding model.
+            executor: Shared pool for search and re-ranking jobs, a private one is created if omitted.
+            rerank_cache: Optional cache of cross-encoder scores, invalidated on index changes.
+            embeddings: Shared embedding model (e.g. from the ModelRegistry); one is loaded if omitted.
+            rerank_scorer: Shared micro-batched cross-encoder; one is loaded if omitted.
         """
-        self.embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
-        self.vector_store = None
-        self.bm25_retriever = None
+        if embeddings is not None:
+            self.embeddings = embeddings
+        else:
+            self.embeddings = load_embeddings(settings.EMBEDDING_MODEL_NAME)
+            if embedding_cache is not None:
+                self.embeddings = CachedEmbeddings(self.embeddings, model_key(settings.EMBEDDING_MODEL_NAME), embedding_cache)
+        self.documents: Dict[str, Document] = {}
+        self._set_bm25_index(BM25Index())
+        # (vector store, FAISS ids of deleted HNSW vectors, selector skipping them), always
+        # replaced as a whole so a search never pairs a store with another store's tombstones
+        self._publish_dense(None)
+
+        # Changes whenever the indexed content changes; caches derived from it subscribe here
+        self.index_version = uuid.uuid4().hex
+        self._index_listeners: List[Callable[[str], None]] = []
         
+        self.executor = executor or BoundedExecutor(
+            settings.MAX_WORKERS, settings.RETRIEVAL_QUEUE_SIZE, name="retrieval"
+        )
+
         # Configuration Flags
         self.use_rrf = use_rrf
         self.use_rerank = use_rerank
@@ -44,7 +82,9 @@ class HybridRetriever(BaseRetriever):
         
         if self.use_rerank:
             # We initialize reranker lazily or here. Here is fine.
-            self.reranker = ReRanker()
+            self.reranker = ReRanker(score_cache=rerank_cache, scorer=rerank_scorer, executor=self.executor)
+            if rerank_cache is not None:
+                self.add_index_listener(rerank_cache.set_index_version)
 
         # Try loading existing index on startup
         if os.path.exists(INDEX_DIR) and os.path.exists(os.path.join(INDEX_DIR, "index.faiss")):
@@ -53,61 +93,290 @@ class HybridRetriever(BaseRetriever):
         else:
             logger.warning("No existing index found. Please ingest data.")
 
-    def index_documents(self, documents: List[Document]):
+    def index_documents(
+        self,
+        documents: List[Document],
+        ids: Optional[List[str]] = None,
+        embeddings: Optional[List[List[float]]] = None
+    ):
+        """Rebuilds both indexes from scratch with the given documents."""
         if not documents:
             return
 
-        # 1. Build Dense Index (FAISS)
-        self.vector_store = FAISS.from_documents(documents, self.embeddings)
-        
-        # 2. Build Sparse Index (BM25)
-        self.bm25_retriever = BM25Retriever.from_documents(documents)
-        self.bm25_retriever.k = self.top_k_retrieval
+        self._publish_dense(None)
+        self.documents.clear()
+        self._set_bm25_index(BM25Index())
+        self.add_documents(documents, ids, embeddings)
+        self.save_index()
+
+    def add_documents(
+        self,
+        documents: List[Document],
+        ids: Optional[List[str]] = None,
+        embeddings: Optional[List[List[float]]] = None
+    ):
+        """
+        Adds documents to the dense and sparse indexes. The dense index is edited as a
+        copy and swapped in, since searches read it concurrently. Precomputed `embeddings` (e.g. from the chunker) are used as-is instead of re-embedding.
+        """
+        if not documents:
+            return
+
+        if ids is None:
+            ids = [doc.metadata.get("chunk_id") or str(uuid.uuid4()) for doc in documents]
+
+        # 1. Dense Index (FAISS): only the new documents are embedded, and only if needed
+        if embeddings is None:
+            embeddings = self.embeddings.embed_documents([doc.page_content for doc in documents])
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        store, tombstones, _ = self._dense
+        if store is None:
+            # A fresh index is trained on the first batch (the whole corpus on a full rebuild)
+            store = self._new_vector_store(vectors)
+        else:
+            store = self._copy_store(store)
+        self._add_vectors(store, documents, ids, vectors)
+
+        # Documents first, so searches of the new store can resolve every hit
+        self.documents.update(zip(ids, documents))
+        # The corpus may have outgrown its index type or IVF training
+        if ann.needs_rebuild(store.index):
+            store, tombstones = self._rebuild_dense(store), set()
+        self._publish_dense(store, tombstones)
+
+        # 2. Sparse Index (BM25), updated incrementally
+        self.bm25_index.add_documents(ids, [doc.page_content for doc in documents])
+        self.sparse_retriever.refresh()
+        self._mark_index_changed()
+        logger.info(f"Added {len(documents)} documents to the index.")
+
+    def delete_documents(self, ids: List[str]):
+        """Removes documents from the dense and sparse indexes; the dense one is swapped like in add_documents."""
+        ids = [doc_id for doc_id in ids if doc_id in self.documents]
+        if not ids:
+            return
+
+        for doc_id in ids:
+            del self.documents[doc_id]
+
+        if not self.documents:
+            self._publish_dense(None)
+        else:
+            self._publish_dense(*self._delete_vectors(ids))
+
+        self.bm25_index.delete_documents(ids)
+        self.sparse_retriever.refresh()
+        self._mark_index_changed()
+        logger.info(f"Deleted {len(ids)} documents from the index.")
+
+    def _new_vector_store(self, vectors: np.ndarray) -> FAISS:
+        index = ann.build_index(vectors, ann.target_index_type(len(vectors)))
+        return FAISS(self.embeddings, index, InMemoryDocstore(), {})
+
+    def _copy_store(self, store: FAISS, copy_index: bool = True) -> FAISS:
+        """
+        A private copy of `store` to edit, while searches keep using the original.
+        copy_index=False shares the FAISS index, for edits that leave it alone.
+        """
+        index = ann.copy_index(store.index) if copy_index else store.index
+        docstore = InMemoryDocstore({
+            doc_id: store.docstore.search(doc_id) for doc_id in store.index_to_docstore_id.values()
+        })
+        return FAISS(self.embeddings, index, docstore, dict(store.index_to_docstore_id))
+
+    def _add_vectors(self, store: FAISS, documents: List[Document], ids: List[str], vectors: np.ndarray):
+        """
+        Adds vectors to `store` under new FAISS ids. Flat is numbered by position, like
+        LangChain does it; HNSW and IVF ids stay fixed, since their deletes don't renumber.
+        """
+        strategy = ann.delete_strategy(store.index)
+        if strategy == "renumber":
+            store.add_embeddings(
+                list(zip([doc.page_content for doc in documents], vectors.tolist())),
+                metadatas=[doc.metadata for doc in documents],
+                ids=ids
+            )
+            return
+
+        if strategy == "tombstone":
+            # Tombstoned vectors keep their slots, so new ones go after them
+            start = store.index.ntotal
+            store.index.add(vectors)
+        else:
+            # Removed ids may be at the end, so continue after the highest live one
+            start = max(store.index_to_docstore_id, default=-1) + 1
+            store.index.add_with_ids(vectors, np.arange(start, start + len(vectors), dtype=np.int64))
+        store.docstore.add(dict(zip(ids, documents)))
+        store.index_to_docstore_id.update({start + i: doc_id for i, doc_id in enumerate(ids)})
+
+    def _delete_vectors(self, ids: List[str]) -> Tuple[FAISS, Set[int]]:
+        """
+        Returns a copy of the dense store without `ids` and its tombstones, without
+        re-embedding: Flat and IVF indexes remove the vectors, HNSW tombstones them and
+        is rebuilt (from its stored vectors) once ANN_HNSW_REBUILD_DELETED_RATIO of it is deleted.
+        """
+        store, tombstones, _ = self._dense
+        strategy = ann.delete_strategy(store.index)
+        # Tombstoning leaves the HNSW graph as it is, so the copy can share it
+        store = self._copy_store(store, copy_index=strategy != "tombstone")
+        if strategy == "renumber":
+            store.delete(ids)
+            return store, tombstones
+
+        deleted = set(ids)
+        positions = [i for i, doc_id in store.index_to_docstore_id.items() if doc_id in deleted]
+        if strategy == "tombstone":
+            tombstones = tombstones | set(positions)
+        else:
+            store.index.remove_ids(np.asarray(positions, dtype=np.int64))
+        for i in positions:
+            del store.index_to_docstore_id[i]
+        store.docstore.delete(ids)
+
+        if strategy == "tombstone" and len(tombstones) > settings.ANN_HNSW_REBUILD_DELETED_RATIO * store.index.ntotal:
+            return self._rebuild_dense(store), set()
+        return store, tombstones
+
+    @property
+    def vector_store(self) -> Optional[FAISS]:
+        return self._dense[0]
+
+    @property
+    def tombstones(self) -> Set[int]:
+        return self._dense[1]
+
+    def _publish_dense(self, store: Optional[FAISS], tombstones: Optional[Set[int]] = None):
+        # The selector is built once per change rather than per search
+        tombstones = tombstones or set()
+        self._dense = (store, tombstones, ann.exclude_selector(tombstones))
+
+    def _rebuild_dense(self, store: FAISS) -> FAISS:
+        """
+        Rebuilds `store` from the documents still in `self.documents`, with the index
+        type their count calls for. Used when the corpus outgrows its index type and
+        to drop tombstoned HNSW vectors.
+        """
+        positions = [(i, doc_id) for i, doc_id in sorted(store.index_to_docstore_id.items()) if doc_id in self.documents]
+        doc_ids = [doc_id for _, doc_id in positions]
+        documents = [self.documents[doc_id] for doc_id in doc_ids]
+
+        vectors = ann.reconstruct_vectors(store.index, [i for i, _ in positions])
+        if vectors is None:
+            vectors = np.asarray(self.embeddings.embed_documents([doc.page_content for doc in documents]), dtype=np.float32)
+
+        new_store = self._new_vector_store(vectors)
+        self._add_vectors(new_store, documents, doc_ids, vectors)
+        logger.info(f"Rebuilt the dense index with {len(doc_ids)} vectors.")
+        return new_store
+
+    def has_documents(self) -> bool:
+        return bool(self.documents)
+
+    def add_index_listener(self, callback: Callable[[str], None]):
+        """Registers `callback(index_version)`, called now and after every index change."""
+        self._index_listeners.append(callback)
+        callback(self.index_version)
+
+    def _mark_index_changed(self, version: Optional[str] = None):
+        self.index_version = version or uuid.uuid4().hex
+        for callback in self._index_listeners:
+            try:
+                callback(self.index_version)
+            except Exception as e:
+                logger.error(f"Index change listener failed: {e}")
 
-        # 3. Save to disk
-        self.save_index(documents)
+    def _set_bm25_index(self, index: BM25Index):
+        self.bm25_index = index
+        # The sparse retriever shares the documents dict, so it is only ever mutated in place
+        self.sparse_retriever = SparseRetriever(index, self.documents)
+        self.sparse_retriever.refresh()
 
-    def save_index(self, documents: List[Document]):
+    def save_index(self):
         if not os.path.exists(INDEX_DIR):
             os.makedirs(INDEX_DIR)
-            
-        # Save FAISS index
-        self.vector_store.save_local(INDEX_DIR)
-        
-        # Save documents for BM25 reconstruction
-        with open(os.path.join(INDEX_DIR, "documents.pkl"), "wb") as f:
-            pickle.dump(documents, f)
-            
-        logger.info(f"Index and documents saved to {INDEX_DIR}")
+
+        store = self.vector_store
+        if store is None:
+            # Nothing left to persist, drop stale files from disk
+            for filename in ("index.faiss", "index.pkl", "documents.pkl"):
+                path = os.path.join(INDEX_DIR, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+            if os.path.exists(BM25_DIR):
+                shutil.rmtree(BM25_DIR)
+            logger.info("Index is empty, removed index files.")
+            return
+
+        # Save FAISS index (its docstore holds the documents)
+        store.save_local(INDEX_DIR)
+
+        # Save the BM25 index in its native format
+        self.bm25_index.save(BM25_DIR)
+
+        with open(os.path.join(INDEX_DIR, "version.txt"), "w") as f:
+            f.write(self.index_version)
+
+        logger.info(f"Index saved to {INDEX_DIR}")
 
     def load_index(self):
         try:
             # Load FAISS index
-            self.vector_store = FAISS.load_local(
-                INDEX_DIR, 
-                self.embeddings, 
+            store = FAISS.load_local(
+                INDEX_DIR,
+                self.embeddings,
                 allow_dangerous_deserialization=True
             )
-            
-            # Load documents and rebuild BM25
-            with open(os.path.join(INDEX_DIR, "documents.pkl"), "rb") as f:
-                documents = pickle.load(f)
-                
-            self.bm25_retriever = BM25Retriever.from_documents(documents)
-            self.bm25_retriever.k = self.top_k_retrieval
-            
+            ann.apply_search_defaults(store.index)
+            tombstones = set()
+            if ann.delete_strategy(store.index) == "tombstone":
+                # Deleted HNSW vectors are the ones without a document
+                tombstones = set(range(store.index.ntotal)) - set(store.index_to_docstore_id)
+            self.documents.clear()
+            self.documents.update({
+                doc_id: store.docstore.search(doc_id)
+                for doc_id in store.index_to_docstore_id.values()
+            })
+            self._publish_dense(store, tombstones)
+
+            if BM25Index.can_load(BM25_DIR):
+                # Memory-mapped, no re-tokenization
+                self._set_bm25_index(BM25Index.load(BM25_DIR))
+            else:
+                # Index from before the native BM25 format or with another tokenizer: build it once and persist
+                logger.info("No usable BM25 index found on disk, building it from the stored documents...")
+                bm25_index = BM25Index()
+                bm25_index.add_documents(
+                    list(self.documents.keys()),
+                    [doc.page_content for doc in self.documents.values()]
+                )
+                bm25_index.save(BM25_DIR)
+                self._set_bm25_index(bm25_index)
+                legacy_path = os.path.join(INDEX_DIR, "documents.pkl")
+                if os.path.exists(legacy_path):
+                    os.remove(legacy_path)
+
+            # Keep the persisted version so on-disk caches stay valid across restarts
+            version_path = os.path.join(INDEX_DIR, "version.txt")
+            if os.path.exists(version_path):
+                with open(version_path) as f:
+                    self._mark_index_changed(f.read().strip())
+            else:
+                self._mark_index_changed()
+
             logger.info("Index loaded successfully.")
         except Exception as e:
             logger.error(f"Failed to load index: {e}")
 
     def clear_index(self):
         """Clears the in-memory and on-disk index."""
-        self.vector_store = None
-        self.bm25_retriever = None
+        self._publish_dense(None)
+        self.documents.clear()
+        self._set_bm25_index(BM25Index())
+        self._mark_index_changed()
         
         if os.path.exists(INDEX_DIR):
             try:
-                import shutil
                 shutil.rmtree(INDEX_DIR)
                 logger.info(f"Cleared index directory: {INDEX_DIR}")
             except Exception as e:
@@ -119,90 +388,161 @@ class HybridRetriever(BaseRetriever):
         self,
         query: str,
         top_k: int = 5,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
     ) -> List[Document]:
+        return (await self.retrieve_many([query], top_k, filters, mode))[0]
 
-        if not self.vector_store or not self.bm25_retriever:
+    async def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> List[List[Document]]:
+        """
+        Batched retrieval for several queries (e.g. expanded queries).
+        Per query the result is the same as `retrieve`, but all queries share one
+        embedding call, one FAISS search, one BM25 product and one re-ranking pass.
+        `mode` "fast" searches approximate dense indexes with less effort.
+        """
+        if not self.is_ready():
+            logger.warning("Attempted retrieval without indexed data.")
+            return [[] for _ in queries]
+
+        logger.info(f"Hybrid Retrieval started for {len(queries)} queries: {queries}")
+        vector_lists, keyword_lists = await self._search_many(queries, filters, mode)
+
+        # Fuse per query, then limit candidates before re-ranking (e.g. top 50)
+        candidate_lists = [
+            self._fuse([vector_docs, keyword_docs])[:self.top_k_retrieval]
+            for vector_docs, keyword_docs in zip(vector_lists, keyword_lists)
+        ]
+
+        # Re-rank all queries in one pass
+        if self.use_rerank:
+            logger.debug("Re-ranking candidates...")
+            final_lists = await self.reranker.arerank_many(queries, candidate_lists, top_k)
+            logger.info(f"Re-ranking complete. Returning {[len(docs) for docs in final_lists]} docs.")
+        else:
+            final_lists = [candidates[:top_k] for candidates in candidate_lists]
+            logger.info(f"Skipping re-ranking. Returning {[len(docs) for docs in final_lists]} docs.")
+
+        return final_lists
+
+    async def gather_candidates(
+        self,
+        queries: List[str],
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[List[Document]]:
+        """Vector and keyword result lists for every query, without fusion or re-ranking."""
+        if not self.is_ready():
             logger.warning("Attempted retrieval without indexed data.")
             return []
 
-        logger.info(f"Hybrid Retrieval started for query: '{query}'")
-
-        # Run vector and keyword retrieval concurrently using ThreadPoolExecutor
-        import asyncio
-        from concurrent.futures import ThreadPoolExecutor
-
-        def retrieve_vector():
-            # 1. Retrieve from Vector Store (with filters)
-            # FAISS supports filters if the underlying docstore supports it, or we can use search_kwargs
-            # For standard FAISS in LangChain, filter support depends on the implementation.
-            # Usually it's passed as 'filter' in search_kwargs.
-            search_kwargs = {"k": self.top_k_retrieval}
-            if filters:
-                search_kwargs["filter"] = filters
-
-            return self.vector_store.similarity_search(query, **search_kwargs)
-
-        def retrieve_keyword():
-            # 2. Retrieve from BM25 (Keyword)
-            # BM25 doesn't natively support metadata filtering easily in this implementation.
-            # We retrieve raw and then could filter manually, but for now we just retrieve.
-            self.bm25_retriever.k = self.top_k_retrieval
-            keyword_docs = self.bm25_retriever.invoke(query)
-
-            # Apply manual filtering to BM25 results if filters exist
-            if filters:
-                filtered_keyword_docs = []
-                for doc in keyword_docs:
-                    match = True
-                    for key, value in filters.items():
-                        if doc.metadata.get(key) != value:
-                            match = False
-                            break
-                    if match:
-                        filtered_keyword_docs.append(doc)
-                keyword_docs = filtered_keyword_docs
-
-            return keyword_docs
-
-        # Execute retrieval tasks concurrently
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=2) as executor:  # 2 workers for vector + keyword retrieval
-            vector_task = loop.run_in_executor(executor, retrieve_vector)
-            keyword_task = loop.run_in_executor(executor, retrieve_keyword)
-
-            vector_docs, keyword_docs = await asyncio.gather(vector_task, keyword_task)
-
-        logger.debug(f"Vector Store result count: {len(vector_docs)}")
-        logger.debug(f"BM25 result count: {len(keyword_docs)}")
+        logger.info(f"Gathering candidates for {len(queries)} queries: {queries}")
+        vector_lists, keyword_lists = await self._search_many(queries, filters)
+        return [docs for pair in zip(vector_lists, keyword_lists) for docs in pair]
 
+    async def fuse_and_rerank(
+        self,
+        ranked_lists: List[List[Document]],
+        rerank_query: str,
+        top_k: int = 5,
+        rerank: bool = True
+    ) -> List[Document]:
+        """
+        Cross-query RRF over all candidate lists, then a single re-ranking pass.
+        rerank=False returns the fused order directly (e.g. for a fast first pass).
+        """
+        candidates = self._fuse(ranked_lists)[:self.top_k_retrieval]
+        if not candidates:
+            return []
+
+        if self.use_rerank and rerank:
+            final_docs = await self.reranker.arerank(rerank_query, candidates, top_k)
+            logger.info(f"Re-ranked {len(candidates)} unique candidates once. Returning {len(final_docs)} docs.")
+            return final_docs
+
+        return candidates[:top_k]
+
+    def is_ready(self) -> bool:
+        return bool(self.vector_store) and self.bm25_index.n_docs > 0
+
+    async def _search_many(
+        self,
+        queries: List[str],
+        filters: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> Tuple[List[List[Document]], List[List[Document]]]:
+        # Run vector and keyword retrieval concurrently on the shared executor
+        vector_lists, keyword_lists = await asyncio.gather(
+            self.executor.run(self._vector_search_many, queries, filters, mode),
+            self.executor.run(self._keyword_search_many, queries, filters)
+        )
+        return vector_lists, keyword_lists
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        if hasattr(self.embeddings, "embed_queries"):
+            return self.embeddings.embed_queries(queries)
+        return [self.embeddings.embed_query(query) for query in queries]
+
+    def _vector_search_many(
+        self,
+        queries: List[str],
+        filters: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> List[List[Document]]:
+        # 1. Retrieve from Vector Store (ingestion swaps it, so search one snapshot)
+        store, _, exclude = self._dense
+        k = self.top_k_retrieval
+        if filters:
+            # Over-fetch, then filter on metadata, like LangChain's FAISS wrapper (fetch_k=20)
+            k = max(k, 20)
+
+        vectors = np.asarray(self._embed_queries(queries), dtype=np.float32)
+        params = ann.search_params(store.index, mode, exclude)
+        if params is not None:
+            _, indices = store.index.search(vectors, k, params=params)
+        else:
+            _, indices = store.index.search(vectors, k)
+
+        results = []
+        for row in indices:
+            docs = []
+            for i in row:
+                if i == -1:
+                    # FAISS pads with -1 when there are fewer than k vectors
+                    continue
+                # Ingestion may delete a hit concurrently, skip those
+                doc = self.documents.get(store.index_to_docstore_id.get(i))
+                if doc is None:
+                    continue
+                if filters and any(doc.metadata.get(key) != value for key, value in filters.items()):
+                    continue
+                docs.append(doc)
+            results.append(docs[:self.top_k_retrieval])
+        return results
+
+    def _keyword_search_many(self, queries: List[str], filters: Optional[Dict[str, Any]] = None) -> List[List[Document]]:
+        # 2. Retrieve from BM25 (Keyword), filters are applied to the hits
+        hits = self.sparse_retriever.search_many(queries, self.top_k_retrieval)
+        return [self.sparse_retriever.resolve(query_hits, filters) for query_hits in hits]
+
+    def _fuse(self, ranked_lists: List[List[Document]]) -> List[Document]:
         # 3. Fuse Results
         if self.use_rrf:
-            fused_docs = self.ensemble.rank_fusion([vector_docs, keyword_docs])
+            fused_docs = self.ensemble.rank_fusion(ranked_lists)
             logger.debug(f"RRF Fusion resulting in {len(fused_docs)} unique docs")
-        else:
-            # Simple fallback: Combine and deduplicate
-            # Prioritize vector docs, then append unseen keyword docs
-            seen_content = set()
-            fused_docs = []
-            for doc in vector_docs + keyword_docs:
+            return fused_docs
+
+        # Simple fallback: Combine and deduplicate
+        # Prioritize earlier lists (vector before keyword), then append unseen docs
+        seen_content = set()
+        fused_docs = []
+        for doc_list in ranked_lists:
+            for doc in doc_list:
                 if doc.page_content not in seen_content:
                     fused_docs.append(doc)
                     seen_content.add(doc.page_content)
-
-        # Limit candidates before re-ranking if we have too many?
-        # RRF already sorts them. We pass all to reranker up to a reasonable limit to save time?
-        # Let's pass top_k_retrieval * 2 or just all of them if reasonable.
-        # For safety/speed, let's limit to top_k_retrieval (e.g. 50) before reranking.
-        candidates = fused_docs[:self.top_k_retrieval]
-
-        # 4. Re-rank
-        if self.use_rerank:
-            logger.debug("Re-ranking candidates...")
-            final_docs = self.reranker.rerank(query, candidates, top_k=top_k)
-            logger.info(f"Re-ranking complete. Returning {len(final_docs)} docs.")
-        else:
-            final_docs = candidates[:top_k]
-            logger.info(f"Skipping re-ranking. Returning {len(final_docs)} docs.")
-
-        return final_docs
+        return fused_docs
@@ -1,29 +1,147 @@
-from typing import List
+import hashlib
+from typing import Dict, List, Optional
 from langchain_core.documents import Document
-from sentence_transformers import CrossEncoder
 
 from app.core.config import settings
+from app.services.inference import load_cross_encoder
+from app.services.retriever.score_cache import RerankScoreCache
+from app.core.batching import MicroBatcher
+from app.core.executor import BoundedExecutor
 
 from app.core.logging import logger
 
+def cross_encoder_scorer(model_name: str) -> MicroBatcher:
+    """Loads `model_name` and returns a micro-batcher over its predict()."""
+    model = load_cross_encoder(model_name)
+    return MicroBatcher(
+        lambda pairs: [float(score) for score in model.predict(pairs)],
+        # Calls of max_batch_size items or more bypass the queue, so 1 disables batching
+        settings.RERANK_BATCH_MAX_SIZE if settings.RERANK_BATCHING else 1,
+        settings.RERANK_BATCH_MAX_WAIT,
+        name=f"rerank:{model_name}"
+    )
+
 class ReRanker:
-    def __init__(self, model_name: str = settings.RERANKER_MODEL_NAME):
+    def __init__(
+        self,
+        model_name: str = settings.RERANKER_MODEL_NAME,
+        score_cache: Optional[RerankScoreCache] = None,
+        scorer: Optional[MicroBatcher] = None,
+        executor: Optional[BoundedExecutor] = None
+    ):
         """
         Initializes the CrossEncoder model for re-ranking.
+        Scores are looked up in `score_cache` first when one is given.
+        `scorer` is a shared micro-batcher over the model's predict (e.g. from the
+        ModelRegistry), so pairs from concurrent requests share forward passes.
+        `executor` runs the blocking score-cache lookups of the async methods.
         """
         logger.info(f"Initializing ReRanker with model: {model_name}")
-        self.model = CrossEncoder(model_name)
+        if scorer is None:
+            scorer = cross_encoder_scorer(model_name)
+        self.scorer = scorer
+        self.score_cache = score_cache
+        self.executor = executor
 
     def rerank(self, query: str, documents: List[Document], top_k: int = 5) -> List[Document]:
         """
         Re-ranks a list of documents based on their relevance to the query.
         """
-        if not documents:
-            return []
+        return self.rerank_many([query], [documents], top_k)[0]
+
+    def rerank_many(self, queries: List[str], document_lists: List[List[Document]], top_k: int = 5) -> List[List[Document]]:
+        """
+        Re-ranks the documents of several queries with a single cross-encoder call.
+        Identical (query, document) pairs are only scored once.
+        """
+        pair_index, pairs, chunk_ids = self._collect_pairs(queries, document_lists)
+        if not pairs:
+            return [[] for _ in queries]
+        scores = self.score_pairs(pairs, chunk_ids)
+        return self._select(queries, document_lists, pair_index, scores, top_k)
+
+    async def arerank(self, query: str, documents: List[Document], top_k: int = 5) -> List[Document]:
+        return (await self.arerank_many([query], [documents], top_k))[0]
+
+    async def arerank_many(self, queries: List[str], document_lists: List[List[Document]], top_k: int = 5) -> List[List[Document]]:
+        """
+        Awaitable rerank_many. The coroutine waits for its micro-batch without
+        holding a worker thread, so many requests can share one forward pass.
+        """
+        pair_index, pairs, chunk_ids = self._collect_pairs(queries, document_lists)
+        if not pairs:
+            return [[] for _ in queries]
+        scores = await self.ascore_pairs(pairs, chunk_ids)
+        return self._select(queries, document_lists, pair_index, scores, top_k)
+
+    @staticmethod
+    def _collect_pairs(queries: List[str], document_lists: List[List[Document]]):
+        pair_index = {}
+        pairs = []
+        chunk_ids = []
+        for query, documents in zip(queries, document_lists):
+            for doc in documents:
+                key = (query, doc.page_content)
+                if key not in pair_index:
+                    pair_index[key] = len(pairs)
+                    pairs.append([query, doc.page_content])
+                    chunk_ids.append(ReRanker._chunk_id(doc))
+        return pair_index, pairs, chunk_ids
+
+    @staticmethod
+    def _select(queries, document_lists, pair_index, scores, top_k: int) -> List[List[Document]]:
+        results = []
+        for query, documents in zip(queries, document_lists):
+            scored = [(doc, scores[pair_index[(query, doc.page_content)]]) for doc in documents]
+            scored = sorted(scored, key=lambda x: x[1], reverse=True)
+            results.append([doc for doc, score in scored[:top_k]])
+        return results
+
+    def score_pairs(self, pairs: List[List[str]], chunk_ids: List[str]) -> List[float]:
+        """Cross-encoder scores for (query, passage) pairs, served from the score cache where possible."""
+        if self.score_cache is None:
+            logger.debug(f"Computing cross-encoder scores for {len(pairs)} pairs")
+            return self.scorer(pairs)
+
+        keys, cached, missing = self._lookup(pairs, chunk_ids)
+        if missing:
+            logger.debug(f"Computing cross-encoder scores for {len(missing)}/{len(pairs)} uncached pairs")
+            self._store(keys, missing, self.scorer([pairs[i] for i in missing]), cached)
+        return [cached[key] for key in keys]
+
+    async def ascore_pairs(self, pairs: List[List[str]], chunk_ids: List[str]) -> List[float]:
+        """Awaitable score_pairs; only the cache lookups use the executor."""
+        if self.score_cache is None:
+            logger.debug(f"Computing cross-encoder scores for {len(pairs)} pairs")
+            return await self.scorer.run(pairs)
+
+        keys, cached, missing = await self._run(self._lookup, pairs, chunk_ids)
+        if missing:
+            logger.debug(f"Computing cross-encoder scores for {len(missing)}/{len(pairs)} uncached pairs")
+            predicted = await self.scorer.run([pairs[i] for i in missing])
+            await self._run(self._store, keys, missing, predicted, cached)
+        return [cached[key] for key in keys]
+
+    async def _run(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        return await self.executor.run(fn, *args)
+
+    def _lookup(self, pairs: List[List[str]], chunk_ids: List[str]):
+        keys = [self.score_cache.make_key(query, chunk_id) for (query, _), chunk_id in zip(pairs, chunk_ids)]
+        cached = self.score_cache.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        return keys, cached, missing
+
+    def _store(self, keys: List[str], missing: List[int], predicted: List[float], cached: Dict[str, float]):
+        new_scores = {keys[i]: float(score) for i, score in zip(missing, predicted)}
+        self.score_cache.put_many(new_scores)
+        cached.update(new_scores)
 
-        pairs = [[query, doc.page_content] for doc in documents]
-        logger.debug(f"Computing cross-encoder scores for {len(documents)} documents")
-        scores = self.model.predict(pairs)
-        results = list(zip(documents, scores))
-        results = sorted(results, key=lambda x: x[1], reverse=True)
-        return [doc for doc, score in results[:top_k]]
+    @staticmethod
+    def _chunk_id(doc: Document) -> str:
+        # Chunks from the ingestion pipeline carry a stable id, fall back to a content hash
+        chunk_id = doc.metadata.get("chunk_id")
+        if chunk_id:
+            return chunk_id
+        return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
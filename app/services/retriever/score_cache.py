@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from app.core.logging import logger
+
+# Rough per-entry footprint: 40-char hex key, float, OrderedDict node
+ENTRY_BYTES = 200
+
+class RerankScoreCache:
+    """
+    LRU cache of cross-encoder scores keyed by (normalized query, chunk id).
+
+    The in-process tier is bounded by a memory budget. An optional SQLite tier
+    keeps scores across restarts. Both tiers are tied to a reranker model and
+    an index version and are wiped when either changes.
+    """
+    def __init__(self, model_name: str, max_bytes: int, disk_path: Optional[str] = None):
+        self.model_name = model_name
+        self.max_entries = max(1, max_bytes // ENTRY_BYTES)
+        self.index_version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.conn = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(disk_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score REAL NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(query: str, chunk_id: str) -> str:
+        normalized = " ".join(query.lower().split())
+        return hashlib.sha1(f"{normalized}\0{chunk_id}".encode("utf-8")).hexdigest()
+
+    def set_index_version(self, version: str):
+        """Drops all scores if the index (or the reranker model) changed since they were computed."""
+        with self._lock:
+            if version == self.index_version:
+                return
+            self.index_version = version
+            self._entries.clear()
+            self.invalidations += 1
+
+            if self.conn is not None:
+                stored = dict(self.conn.execute("SELECT name, value FROM meta").fetchall())
+                if stored.get("model") != self.model_name or stored.get("index_version") != version:
+                    self.conn.execute("DELETE FROM scores")
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                        [("model", self.model_name), ("index_version", version)]
+                    )
+                    self.conn.commit()
+        logger.info(f"Rerank score cache reset for index version {version}")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, float]:
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for key in keys:
+                score = self._entries.get(key)
+                if score is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = score
+
+            missing = [key for key in keys if key not in found]
+            if missing and self.conn is not None:
+                for i in range(0, len(missing), 500):
+                    batch = missing[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self.conn.execute(
+                        f"SELECT key, score FROM scores WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, score in rows:
+                        found[key] = score
+                        self._insert(key, score)
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, scores: Dict[str, float]):
+        if not scores:
+            return
+        with self._lock:
+            for key, score in scores.items():
+                self._insert(key, float(score))
+            if self.conn is not None:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO scores (key, score) VALUES (?, ?)",
+                    [(key, float(score)) for key, score in scores.items()]
+                )
+                self.conn.commit()
+
+    def _insert(self, key: str, score: float):
+        self._entries[key] = score
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "disk_tier": self.conn is not None,
+            }
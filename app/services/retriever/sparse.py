@@ -0,0 +1,114 @@
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from langchain_core.documents import Document
+from app.services.retriever.base import BaseRetriever
+from app.services.retriever.bm25_index import BM25Index, tokenize
+from app.core.logging import logger
+
+class SparseRetriever(BaseRetriever):
+    """
+    Vectorized BM25 retriever over a BM25Index.
+
+    BM25 term weights are precomputed into a (terms x docs) CSR matrix, so
+    scoring a batch of queries is a single sparse product that only touches
+    the postings of the query terms. Top-k uses argpartition instead of a
+    full sort.
+    """
+    def __init__(self, index: BM25Index, documents: Dict[str, Document]):
+        """
+        Args:
+            index: The BM25 index to score against.
+            documents: Chunk id -> Document lookup used to resolve hits.
+        """
+        self.index = index
+        self.documents = documents
+        # (weight matrix, row -> chunk id), swapped as one so searches never mix versions
+        self._snapshot: Optional[Tuple[sparse.csr_matrix, List[str]]] = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Compacts the index and rebuilds the weight matrix. Called on the write side
+        (after ingest changes), so searches only ever read a finished snapshot.
+        """
+        with self._lock:
+            index = self.index
+            with index._lock:
+                if index.has_pending_changes():
+                    index.compact()
+
+                n_terms = len(index.term_indptr) - 1
+                n_rows = len(index.doc_ids)
+                term_indptr = np.asarray(index.term_indptr)
+                rows = np.asarray(index.post_rows)
+                tfs = np.asarray(index.post_tfs)
+
+                if n_rows:
+                    avgdl = index.total_len / n_rows
+                    terms = np.repeat(np.arange(n_terms), np.diff(term_indptr))
+                    idf = index.idf(index.df[:n_terms].astype(np.float32))
+                    norm = index.k1 * (1 - index.b + index.b * index.doc_len[rows] / avgdl)
+                    data = (idf[terms] * tfs * (index.k1 + 1) / (tfs + norm)).astype(np.float32)
+                else:
+                    data = tfs
+
+                weights = sparse.csr_matrix((data, rows, term_indptr), shape=(n_terms, n_rows))
+                # Copied: adds append to the index's list before the next refresh
+                self._snapshot = (weights, index.doc_ids[:n_rows])
+
+            logger.debug(f"Built BM25 weight matrix with {weights.nnz} postings")
+
+    def _query_matrix(self, queries: List[str], n_terms: int) -> sparse.csr_matrix:
+        indptr, indices, data = [0], [], []
+        for query in queries:
+            for term, qtf in Counter(tokenize(query)).items():
+                term_id = self.index.vocab.get(term)
+                if term_id is not None and term_id < n_terms:
+                    indices.append(term_id)
+                    data.append(float(qtf))
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(queries), n_terms)
+        )
+
+    def search_many(self, queries: List[str], k: int) -> List[List[Tuple[str, float]]]:
+        """Scores all queries in one sparse product and returns the top-k (chunk id, score) per query."""
+        if self._snapshot is None:
+            self.refresh()
+        weights, doc_ids = self._snapshot
+        scores = (self._query_matrix(queries, weights.shape[0]) @ weights).tocsr()
+
+        results = []
+        for i in range(len(queries)):
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            row_scores = scores.data[start:end]
+            row_docs = scores.indices[start:end]
+            if len(row_scores) > k:
+                top = np.argpartition(-row_scores, k - 1)[:k]
+                row_scores, row_docs = row_scores[top], row_docs[top]
+            order = np.argsort(-row_scores, kind="stable")
+            results.append([(doc_ids[row_docs[j]], float(row_scores[j])) for j in order])
+        return results
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        return self.search_many([query], k)[0]
+
+    async def retrieve(self, query: str, top_k: int = 3, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        return self.resolve(self.search(query, top_k), filters)
+
+    def resolve(self, hits: List[Tuple[str, float]], filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Maps (chunk id, score) hits to Documents, applying metadata filters."""
+        docs = []
+        for doc_id, _ in hits:
+            # Ingestion may delete a hit concurrently, skip those
+            doc = self.documents.get(doc_id)
+            if doc is None:
+                continue
+            if filters and any(doc.metadata.get(key) != value for key, value in filters.items()):
+                continue
+            docs.append(doc)
+        return docs
@@ -1,9 +1,11 @@
 from app.services.llm.providers import GroqLLM, GeminiLLM, OpenAILLM, LocalLLM
 from app.core.config import settings
+from app.core.http import HttpClientPool, ollama_base_url
 from app.core.logging import logger
 
 class LLMRouter:
-    def __init__(self):
+    def __init__(self, http_clients: HttpClientPool = None):
+        self.http_clients = http_clients
         self.groq = None
         self.gemini = None
         self.openai = None
@@ -30,10 +32,20 @@ class LLMRouter:
             return self.openai
         elif provider_name == "local":
             if not self.local:
-                self.local = LocalLLM()
+                client = self.http_clients.client("ollama", ollama_base_url()) if self.http_clients else None
+                self.local = LocalLLM(client)
             return self.local
         else:
             # Default to openai if invalid provider specified
             if not self.openai:
                 self.openai = OpenAILLM()
             return self.openai
+
+    async def close(self):
+        """Close the clients of every provider created so far."""
+        for provider in (self.groq, self.gemini, self.openai, self.local):
+            if provider is not None:
+                try:
+                    await provider.close()
+                except Exception as e:
+                    logger.error(f"Failed to close {provider.__class__.__name__}: {e}")
@@ -54,7 +54,7 @@ const MessageBubble = ({ msg, loading, onRegenerate }) => {
                                     }
                                 }}
                             >
-                                {msg.content.split('__METADATA__')[0]}
+                                {msg.content}
                             </ReactMarkdown>
                         </div>
                     ) : (
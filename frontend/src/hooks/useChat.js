@@ -230,57 +230,57 @@ export const useChat = () => {
 
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
-            let done = false;
+            let buffer = '';
 
-            while (!done) {
-                const { value, done: doneReading } = await reader.read();
-                done = doneReading;
+            const updateAiMessage = (update) => {
+                setMessages(prev => prev.map(m => m.id === aiMsgId ? { ...m, ...update(m) } : m));
+            };
+
+            const handleEvent = (event, data) => {
+                switch (event) {
+                    case 'status':
+                        setThinkingStatus(data.message);
+                        break;
+                    case 'citations':
+                        updateAiMessage(() => ({ citations: data.citations }));
+                        break;
+                    case 'token':
+                        updateAiMessage(m => ({ content: m.content + data.text }));
+                        break;
+                    case 'usage':
+                        updateAiMessage(() => ({ timings: data.timings, usage: data }));
+                        break;
+                    case 'error':
+                        updateAiMessage(m => ({ content: m.content + `Error: ${data.message}` }));
+                        break;
+                    case 'done':
+                        setThinkingStatus(null);
+                        break;
+                    default:
+                        break;
+                }
+            };
+
+            while (true) {
+                const { value, done } = await reader.read();
                 if (done) break;
-                
-                const chunkValue = decoder.decode(value, { stream: true });
 
-                setMessages(prev => {
-                    const newMessages = [...prev];
-                    const msgIndex = newMessages.findIndex(m => m.id === aiMsgId);
-                    if (msgIndex !== -1) {
-                         let fullContent = newMessages[msgIndex].content + chunkValue;
-                         
-                         // Check for status updates
-                         const statusMatch = fullContent.match(/__STATUS__: (.*?)(?:\n|$)/);
-                         if (statusMatch) {
-                             setThinkingStatus(statusMatch[1]);
-                             fullContent = fullContent.replace(/__STATUS__: .*?(?:\n|$)/g, '');
-                         }
+                // SSE: events are separated by a blank line, each has "event:" and "data:" fields
+                buffer += decoder.decode(value, { stream: true });
+                const frames = buffer.split('\n\n');
+                buffer = frames.pop();
 
-                         let citations = newMessages[msgIndex].citations || [];
-                         
-                         if (fullContent.includes("__METADATA__")) {
-                            const parts = fullContent.split("__METADATA__");
-                            if (parts.length > 1) {
-                                const potentialContent = parts[0]; 
-                                const metadataJson = parts[1];
-                                
-                                try {
-                                    if (metadataJson.trim().endsWith("]")) {
-                                        citations = JSON.parse(metadataJson.trim());
-                                        // Only strip metadata from content if we successfully parsed it
-                                        fullContent = potentialContent;
-                                        setThinkingStatus(null); // Clear status when done
-                                    }
-                                } catch (e) {
-                                    // ignore incomplete json, keep fullContent as is (with METADATA) for now
-                                }
-                            }
-                         }
-                         
-                         newMessages[msgIndex] = {
-                             ...newMessages[msgIndex],
-                             content: fullContent,
-                             citations: citations
-                         };
+                for (const frame of frames) {
+                    let event = 'message';
+                    let data = '';
+                    for (const line of frame.split('\n')) {
+                        if (line.startsWith(':')) continue; // heartbeat comment
+                        if (line.startsWith('event:')) event = line.slice(6).trim();
+                        else if (line.startsWith('data:')) data += line.slice(5).trim();
                     }
-                    return newMessages;
-                });
+                    if (!data) continue;
+                    handleEvent(event, JSON.parse(data));
+                }
             }
 
             // Finalize
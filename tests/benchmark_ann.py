@@ -0,0 +1,119 @@
+"""
+Recall@k vs latency of the dense index types against the exact (Flat) index.
+
+    python tests/benchmark_ann.py                      # vectors from data/index, or synthetic
+    python tests/benchmark_ann.py --synthetic 200000 --types hnsw ivfpq
+
+Each index is built with the app's settings (ANN_* in .env), then searched one
+query at a time, like a request would, at several nprobe / efSearch values.
+"""
+import os
+import sys
+import time
+import pickle
+import argparse
+import numpy as np
+import faiss
+
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.services.retriever import ann
+
+INDEX_PATH = os.path.join("data", "index", "index.faiss")
+MAPPING_PATH = os.path.join("data", "index", "index.pkl")
+NPROBES = (1, 4, 16, 64)
+EF_SEARCHES = (16, 32, 64, 128)
+
+def load_vectors(synthetic: int, dim: int) -> np.ndarray:
+    if not synthetic and os.path.exists(INDEX_PATH):
+        # Only ids that still map to a document: deleted ones may remain in HNSW indexes
+        with open(MAPPING_PATH, "rb") as f:
+            _, index_to_docstore_id = pickle.load(f)
+        vectors = ann.reconstruct_vectors(faiss.read_index(INDEX_PATH), sorted(index_to_docstore_id))
+        if vectors is not None:
+            print(f"Using {len(vectors)} vectors from {INDEX_PATH}")
+            return vectors
+        print(f"{INDEX_PATH} holds compressed vectors, using synthetic data instead")
+    n = synthetic or 50_000
+    # Clustered data behaves more like text embeddings than uniform noise
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(max(1, n // 100), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    print(f"Using {n} synthetic {dim}-d vectors")
+    return vectors
+
+def timed_search(index, queries, k, params):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        if params is None:
+            _, ids = index.search(query[None, :], k)
+        else:
+            _, ids = index.search(query[None, :], k, params=params)
+        latencies.append(time.perf_counter() - start)
+        results.append(ids[0])
+    return np.asarray(results), np.asarray(latencies) * 1000
+
+def recall(results, truth, k):
+    return np.mean([len(set(r[:k]) & set(t[:k])) / k for r, t in zip(results, truth)])
+
+def sweep(index_type):
+    if index_type == "hnsw":
+        return [(f"efSearch={ef}", faiss.SearchParametersHNSW(efSearch=ef)) for ef in EF_SEARCHES]
+    if index_type in ("ivf", "ivfpq", "opq"):
+        params = []
+        for nprobe in NPROBES:
+            ivf = faiss.SearchParametersIVF(nprobe=nprobe)
+            if index_type == "opq":
+                ivf = faiss.SearchParametersPreTransform(index_params=ivf)
+            params.append((f"nprobe={nprobe}", ivf))
+        return params
+    return [("exact", None)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark N synthetic vectors instead of the index")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(ann.INDEX_TYPES), choices=ann.INDEX_TYPES)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.synthetic, args.dim)
+    rng = np.random.default_rng(1)
+    # Perturbed corpus vectors stand in for queries that land near real chunks
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    truth, _ = timed_search(exact, queries, args.k, None)
+
+    print(f"\nrecall@{args.k} vs exact search, {args.queries} single-query searches")
+    print(f"{'index':<8}{'setting':<14}{'recall':>8}{'mean ms':>10}{'p95 ms':>10}{'build s':>10}{'size MB':>10}")
+    for requested in args.types:
+        start = time.perf_counter()
+        index = ann.build_index(vectors, requested)
+        index.add(vectors)
+        build_time = time.perf_counter() - start
+        size_mb = len(faiss.serialize_index(index)) / 1e6
+        index_type = ann.index_type_of(index)
+
+        for label, params in sweep(index_type):
+            results, latencies = timed_search(index, queries, args.k, params)
+            print(
+                f"{index_type:<8}{label:<14}{recall(results, truth, args.k):>8.3f}"
+                f"{latencies.mean():>10.3f}{np.percentile(latencies, 95):>10.3f}"
+                f"{build_time:>10.1f}{size_mb:>10.1f}"
+            )
+
+    print(
+        f"\nApp settings: nprobe {settings.ANN_NPROBE} (fast {settings.ANN_NPROBE_FAST}), "
+        f"efSearch {settings.ANN_EF_SEARCH} (fast {settings.ANN_EF_SEARCH_FAST})"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -11,18 +11,8 @@ from app.core.logging import logger
 def debug_ingest():
     print("Starting debug ingestion...")
     try:
-        loader = container.document_loader
-        documents = loader.load_documents()
-        
-        if not documents:
-            print("No documents found.")
-            return
-
-        chunker = container.semantic_chunker
-        chunked_docs = chunker.chunk_documents(documents)
-        
-        container.retriever.index_documents(chunked_docs)
-        print(f"Indexed {len(chunked_docs)} chunks successfully.")
+        stats = container.ingestion_pipeline.run()
+        print(f"Ingestion finished: {stats}")
     except Exception as e:
         print(f"Ingestion failed: {e}")
         import traceback
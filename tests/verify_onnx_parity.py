@@ -0,0 +1,118 @@
+"""
+Checks that the ONNX backend (int8 when ONNX_QUANTIZE=true) ranks like the PyTorch one.
+
+    ONNX_QUANTIZE=true python tests/verify_onnx_parity.py
+
+Passages come from the current index if one exists, otherwise from a small built-in sample.
+"""
+import os
+import sys
+import time
+import numpy as np
+from scipy.stats import spearmanr
+
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.services.inference import load_embeddings, load_cross_encoder
+
+TOP_K = 3
+MIN_COSINE = 0.99
+MIN_TOP_K_OVERLAP = 0.9
+MIN_SPEARMAN = 0.95
+
+QUERIES = [
+    "What is FAISS used for?",
+    "How does BM25 score documents?",
+    "Why re-rank retrieved passages?",
+    "How are documents split into chunks?",
+    "What does query expansion do?",
+    "How is chat history stored?",
+]
+
+SAMPLE_PASSAGES = [
+    "FAISS is a library for efficient similarity search and clustering of dense vectors.",
+    "BM25 ranks documents by term frequency, inverse document frequency and document length.",
+    "A cross-encoder reads the query and passage together and outputs a relevance score.",
+    "Semantic chunking splits text where the embedding similarity between sentences drops.",
+    "Query expansion rewrites a question into several variants to improve recall.",
+    "Conversation turns are stored in SQLite and older turns are summarized.",
+    "Reciprocal rank fusion combines ranked lists by summing 1 / (k + rank).",
+    "Embeddings map text to vectors so that similar meanings are close together.",
+    "The retriever combines vector search with keyword search for better coverage.",
+    "Server-Sent Events stream tokens to the browser over a single HTTP response.",
+    "An inverted index maps each term to the documents that contain it.",
+    "Int8 quantization stores weights in 8 bits to speed up CPU inference.",
+]
+
+def load_passages(limit: int = 200):
+    index_dir = "data/index"
+    if os.path.exists(os.path.join(index_dir, "index.faiss")):
+        from app.services.retriever.hybrid import HybridRetriever
+        retriever = HybridRetriever(use_rerank=False)
+        passages = [doc.page_content for doc in list(retriever.documents.values())[:limit]]
+        if passages:
+            print(f"Using {len(passages)} passages from the index.")
+            return passages
+    print(f"Using {len(SAMPLE_PASSAGES)} built-in passages.")
+    return SAMPLE_PASSAGES
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+
+def embed(embeddings, passages):
+    start = time.perf_counter()
+    doc_vectors = normalize(embeddings.embed_documents(passages))
+    query_vectors = normalize([embeddings.embed_query(q) for q in QUERIES])
+    return doc_vectors, query_vectors, time.perf_counter() - start
+
+def top_k(scores, k: int = TOP_K):
+    return set(np.argsort(-np.asarray(scores))[:k].tolist())
+
+def check_embeddings(passages) -> bool:
+    model = settings.EMBEDDING_MODEL_NAME
+    print(f"\nEmbeddings: {model}")
+    torch_docs, torch_queries, torch_time = embed(load_embeddings(model, "torch"), passages)
+    onnx_docs, onnx_queries, onnx_time = embed(load_embeddings(model, "onnx"), passages)
+
+    cosine = float(np.mean(np.sum(torch_docs * onnx_docs, axis=1)))
+    overlap = np.mean([
+        len(top_k(torch_docs @ tq) & top_k(onnx_docs @ oq)) / TOP_K
+        for tq, oq in zip(torch_queries, onnx_queries)
+    ])
+    print(f"  mean cosine torch vs onnx: {cosine:.4f} (min {MIN_COSINE})")
+    print(f"  top-{TOP_K} overlap:         {overlap:.3f} (min {MIN_TOP_K_OVERLAP})")
+    print(f"  time torch {torch_time * 1000:.0f} ms, onnx {onnx_time * 1000:.0f} ms")
+    return cosine >= MIN_COSINE and overlap >= MIN_TOP_K_OVERLAP
+
+def check_reranker(passages) -> bool:
+    model = settings.RERANKER_MODEL_NAME
+    print(f"\nRe-ranker: {model}")
+    pairs = [[q, p] for q in QUERIES for p in passages]
+    results = {}
+    for backend in ("torch", "onnx"):
+        encoder = load_cross_encoder(model, backend)
+        start = time.perf_counter()
+        scores = np.asarray(encoder.predict(pairs), dtype=np.float32).reshape(len(QUERIES), len(passages))
+        results[backend] = (scores, time.perf_counter() - start)
+
+    torch_scores, torch_time = results["torch"]
+    onnx_scores, onnx_time = results["onnx"]
+    correlation = float(np.mean([spearmanr(t, o).correlation for t, o in zip(torch_scores, onnx_scores)]))
+    overlap = np.mean([len(top_k(t) & top_k(o)) / TOP_K for t, o in zip(torch_scores, onnx_scores)])
+    print(f"  mean Spearman per query: {correlation:.4f} (min {MIN_SPEARMAN})")
+    print(f"  top-{TOP_K} overlap:         {overlap:.3f} (min {MIN_TOP_K_OVERLAP})")
+    print(f"  time torch {torch_time * 1000:.0f} ms, onnx {onnx_time * 1000:.0f} ms")
+    return correlation >= MIN_SPEARMAN and overlap >= MIN_TOP_K_OVERLAP
+
+if __name__ == "__main__":
+    print(f"ONNX backend, quantized={settings.ONNX_QUANTIZE} ({settings.ONNX_QUANTIZATION_CONFIG})")
+    passages = load_passages()
+    embeddings_ok = check_embeddings(passages)
+    reranker_ok = check_reranker(passages)
+    if embeddings_ok and reranker_ok:
+        print("\nSUCCESS: ONNX backend ranks in line with PyTorch.")
+    else:
+        print("\nFAILURE: ONNX backend diverges from PyTorch beyond the thresholds.")
+        sys.exit(1)
@@ -17,7 +17,7 @@ async def test_ingest():
         await asyncio.sleep(5)
 
 def verify_files_exist():
-    if os.path.exists(INDEX_DIR) and os.path.exists(os.path.join(INDEX_DIR, "index.faiss")) and os.path.exists(os.path.join(INDEX_DIR, "documents.pkl")):
+    if os.path.exists(INDEX_DIR) and os.path.exists(os.path.join(INDEX_DIR, "index.faiss")) and os.path.exists(os.path.join(INDEX_DIR, "bm25", "vocab.txt")):
         print("SUCCESS: Index files found on disk.")
         return True
     else:
@@ -28,7 +28,7 @@ async def verify_load_offline():
     print("\nTesting Offline Loading (simulating restart)...")
     try:
         retriever = HybridRetriever()
-        if retriever.vector_store is not None and retriever.bm25_retriever is not None:
+        if retriever.vector_store is not None and retriever.bm25_index.n_docs > 0:
             print("SUCCESS: HybridRetriever loaded index from disk.")
             
             # Test retrieval